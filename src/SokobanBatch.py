@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from multiprocessing.connection import wait
+from typing import List, Optional
+
+from SokobanSolver import SokobanSolver
+from SokobanCache import SolutionCache, DEFAULT_CACHE_PATH, config_key
+from SokobanPatterns import PatternStore, DEFAULT_PATTERN_PATH
+
+try:
+    import resource
+except ImportError:  # Windows 下没有 resource 模块，峰值内存记为 null
+    resource = None
+
+
+def load_level(path: str) -> List[str]:
+    # 与 GUI 导入场景一致：去掉行尾换行，跳过空行
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f.readlines() if line.strip() != '']
+
+
+def collect_levels(paths: List[str]) -> List[str]:
+    """展开命令行参数：文件原样保留，目录递归收集其中的 .txt 关卡文件。"""
+    levels = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                levels.extend(os.path.join(root, name) for name in sorted(files) if name.endswith('.txt'))
+        else:
+            levels.append(path)
+    return levels
+
+
+def _peak_memory_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _progress_printer(name: str):
+    # 进度写到标准错误，每行一个 JSON，避免与标准输出中的结果行混在一起
+    def report(stats: dict) -> None:
+        sys.stderr.write(json.dumps({'level': name, 'progress': stats}, ensure_ascii=False) + '\n')
+        sys.stderr.flush()
+    return report
+
+
+def solve_map(board_map: List[str], name: str, push_level: bool = False, weight: float = 1, method: str = 'solve',
+              progress_interval: Optional[int] = None, time_limit: Optional[float] = None,
+              max_expanded: Optional[int] = None, max_visited: Optional[int] = None,
+              cache_path: Optional[str] = None, macros: bool = False, spill_dir: Optional[str] = None,
+              spill_entries: int = 1 << 20, pattern_path: Optional[str] = None) -> dict:
+    """
+    在工作进程中求解一张地图，返回一条结果记录（可直接序列化为 JSON）。
+
+    progress_interval 非空时，每扩展这么多节点向标准错误输出一行进度。
+    time_limit / max_expanded / max_visited 为搜索预算（solve_ida 不支持），
+    预算耗尽且没有得到解时状态记为 budget_exhausted。
+    搜索前先调用 check_feasibility()，明显无解时直接记为 unsolvable，reason 为原因代码。
+    cache_path 非空时先查该求解缓存，命中则直接返回缓存结果（cached 为 true），否则求解后写回。
+    macros 为 True 时启用隧道/目标房间宏推箱（不保证最优）。
+    spill_dir 非空时 A* 的 visited 表超过 spill_entries 个状态后溢出到该目录下的临时文件。
+    pattern_path 非空时加载该死锁模式库用于剪枝，并把本次证明的新模式写回；缓存配置键中记为 patterns。
+    """
+    record = {'level': name, 'status': None, 'moves': None, 'pushes': None,
+              'expanded': None, 'generated': None, 'time': None, 'peak_memory_kb': None, 'error': None,
+              'stats': None, 'cached': False, 'reason': None}
+    start = time.perf_counter()
+    cache = None
+    patterns = None
+    try:
+        if not board_map:
+            record['status'] = 'invalid'
+            record['error'] = '文件为空或格式不正确'
+            return record
+        if pattern_path:
+            patterns = PatternStore(pattern_path)
+        solver = SokobanSolver(board_map, push_level=push_level, weight=weight, macros=macros,
+                               spill_dir=spill_dir, spill_entries=spill_entries, patterns=patterns)
+        # 先做静态可行性检查，明显无解的关卡无需搜索即可返回
+        infeasible = solver.check_feasibility()
+        if infeasible is not None:
+            record['reason'] = infeasible[0]
+            if infeasible[0] == 'no_player':
+                record['status'] = 'invalid'
+                record['error'] = infeasible[1]
+            else:
+                record['status'] = 'unsolvable'
+            return record
+        # 不启用宏推箱/模式库时不写入对应选项，与 GUI 及已有缓存条目的配置键保持一致
+        options = {'macros': True} if macros else {}
+        if patterns is not None:
+            options['patterns'] = True
+        config = config_key(method=method, push_level=push_level, weight=weight, **options)
+        if cache_path:
+            cache = SolutionCache(cache_path)
+            hit = cache.get(board_map, config)
+            if hit is not None:
+                record.update(status=hit['status'], moves=hit['moves'], stats=hit['stats'], cached=True)
+                if hit['stats'] is not None:
+                    record['expanded'] = hit['stats'].get('expanded')
+                    record['generated'] = hit['stats'].get('generated')
+                if hit['moves'] is not None:
+                    record['pushes'] = sum(1 for move in hit['moves'] if move.isupper())
+                return record
+        progress = _progress_printer(name) if progress_interval else None
+        budget = {key: value for key, value in (('time_limit', time_limit), ('max_expanded', max_expanded),
+                                                ('max_visited', max_visited)) if value is not None}
+        path_moves = getattr(solver, method)(progress=progress, progress_interval=progress_interval, **budget)
+        record['expanded'] = solver.stats['expanded']
+        record['generated'] = solver.stats['generated']
+        record['stats'] = solver.stats
+        if path_moves is None:
+            record['status'] = 'budget_exhausted' if solver.stats['budget_exhausted'] else 'unsolvable'
+        else:
+            record['status'] = 'solved'
+            record['moves'] = ''.join(path_moves)
+            record['pushes'] = sum(1 for move in path_moves if move.isupper())
+        # 只缓存与预算无关的结果：预算耗尽的不缓存，anytime 的解只有证明最优后才缓存
+        if cache is not None and record['status'] != 'budget_exhausted' and (
+                method != 'solve_anytime' or solver.stats.get('optimal') or path_moves is None):
+            cache.put(board_map, config, record['moves'], solver.stats, record['status'])
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = str(e)
+    finally:
+        if cache is not None:
+            cache.close()
+        if patterns is not None:
+            patterns.close()
+        record['time'] = round(time.perf_counter() - start, 6)
+        record['peak_memory_kb'] = _peak_memory_kb()
+    return record
+
+
+def _error_record(path: str, error: str) -> dict:
+    return {'level': path, 'status': 'error', 'moves': None, 'pushes': None, 'expanded': None,
+            'generated': None, 'time': None, 'peak_memory_kb': None, 'error': error, 'stats': None,
+            'cached': False, 'reason': None}
+
+
+def solve_level(path: str, **solver_options) -> dict:
+    """读取关卡文件并求解；文件无法读取时记为 error。"""
+    try:
+        board_map = load_level(path)
+    except OSError as e:
+        return _error_record(path, str(e))
+    return solve_map(board_map, path, **solver_options)
+
+
+def _level_worker(conn, path: str, solver_options: dict) -> None:
+    # 工作进程入口：求解一个关卡，把结果记录发回主进程后退出
+    conn.send(solve_level(path, **solver_options))
+    conn.close()
+
+
+def run_batch(levels: List[str], workers: Optional[int] = None, out=sys.stdout, **solver_options) -> int:
+    """
+    在多个工作进程中并行求解关卡，每完成一个就向 out 写出一行 JSON。
+
+    每个关卡在单独的工作进程中求解，完成后进程即退出，保证峰值内存按关卡统计。
+    某个工作进程异常退出（如内存不足被系统杀死）时，该关卡记为 error，其余关卡照常求解。
+    返回求解成功的关卡数。
+    """
+    workers = workers or os.cpu_count() or 1
+    pending = list(reversed(levels))
+    running = {}  # 接收端 -> (进程, 关卡)
+    solved = 0
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                level = pending.pop()
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(target=_level_worker, args=(sender, level, solver_options))
+                process.start()
+                # 关闭主进程中的发送端，工作进程退出后接收端才能读到 EOF
+                sender.close()
+                running[receiver] = (process, level)
+            for receiver in wait(list(running)):
+                process, level = running.pop(receiver)
+                try:
+                    record = receiver.recv()
+                except EOFError:
+                    process.join()
+                    record = _error_record(level, f'工作进程异常退出（退出码 {process.exitcode}）')
+                receiver.close()
+                process.join()
+                if record['status'] == 'solved':
+                    solved += 1
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+    finally:
+        for process, _ in running.values():
+            process.terminate()
+    return solved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sokoban 无界面批量求解")
+    parser.add_argument('paths', nargs='+', help='关卡文件或包含 .txt 关卡的目录')
+    parser.add_argument('--workers', type=int, default=None, help='工作进程数（默认为 CPU 核数）')
+    parser.add_argument('--push-level', action='store_true', help='使用推箱级搜索')
+    parser.add_argument('--weight', type=float, default=1, help='加权 A* 的权重（默认 1，即最优 A*）')
+    parser.add_argument('--ida', action='store_true', help='使用内存受限的 IDA* 求解')
+    parser.add_argument('--anytime', action='store_true', help='使用 anytime 加权 A*：先快速出解，预算内持续改进')
+    parser.add_argument('--bidirectional', action='store_true', help='使用双向推箱级搜索（推箱数最优）')
+    parser.add_argument('--time-limit', type=float, default=None, metavar='SECONDS', help='每个关卡的求解时间上限')
+    parser.add_argument('--max-expanded', type=int, default=None, help='每个关卡最多扩展的节点数')
+    parser.add_argument('--max-visited', type=int, default=None, help='visited 表的最大条目数（限制内存）')
+    parser.add_argument('--macros', action='store_true', help='启用隧道/目标房间宏推箱（更快，但不保证最优）')
+    parser.add_argument('--spill-dir', default=None, help='visited 表超出内存上限后溢出到该目录（以磁盘 I/O 换内存）')
+    parser.add_argument('--spill-entries', type=int, default=1 << 20, help='溢出前内存中最多保留的状态数')
+    parser.add_argument('--patterns', default=None, metavar='PATH',
+                        help=f'使用跨求解复用的死锁模式库文件（sqlite），如 {DEFAULT_PATTERN_PATH}')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help='求解结果缓存文件（sqlite）')
+    parser.add_argument('--no-cache', action='store_true', help='不读写求解缓存')
+    parser.add_argument('--progress', type=int, default=None, metavar='N',
+                        help='每扩展 N 个节点向标准错误输出一行进度 JSON')
+    args = parser.parse_args()
+    if args.ida + args.anytime + args.bidirectional > 1:
+        parser.error('--ida、--anytime 与 --bidirectional 只能选择一个')
+    if args.ida and (args.time_limit is not None or args.max_expanded is not None or args.max_visited is not None):
+        parser.error('IDA* 不支持搜索预算参数')
+
+    levels = collect_levels(args.paths)
+    method = ('solve_ida' if args.ida else 'solve_anytime' if args.anytime
+              else 'solve_bidirectional' if args.bidirectional else 'solve')
+    run_batch(levels, workers=args.workers, push_level=args.push_level, weight=args.weight, method=method,
+              progress_interval=args.progress, time_limit=args.time_limit, max_expanded=args.max_expanded,
+              max_visited=args.max_visited, cache_path=None if args.no_cache else args.cache, macros=args.macros,
+              spill_dir=args.spill_dir, spill_entries=args.spill_entries,
+              pattern_path=args.patterns)
@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from SokobanBatch import load_level, solve_map
+
+# 仓库自带的关卡，位于 src/ 的上一级目录
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CURATED_LEVELS = ('default.txt', '1.txt', '2.txt', '3.txt')
+# 生成关卡的 (行数, 列数, 箱子数)，箱子数与地图尺寸逐级增大
+GENERATED_SIZES = ((7, 7, 1), (8, 9, 2), (12, 17, 2), (9, 11, 3), (9, 13, 4))
+
+
+def make_room_level(rows: int, cols: int, boxes: int) -> List[str]:
+    """
+    生成一个必然可解的矩形房间关卡。
+
+    箱子隔列排在第 2 行，目标点位于各自正下方的倒数第 3 行，玩家在左上角；
+    逐个从上方把箱子推下去即可，箱子数与房间尺寸共同决定搜索规模。
+    """
+    if rows < 6 or cols < 2 * boxes + 3:
+        raise ValueError("房间尺寸不足以放下指定数量的箱子")
+    grid = [['#'] * cols] + [['#'] + [' '] * (cols - 2) + ['#'] for _ in range(rows - 2)] + [['#'] * cols]
+    for i in range(boxes):
+        c = 2 + 2 * i
+        grid[2][c] = '$'
+        grid[rows - 3][c] = '.'
+    grid[1][1] = '@'
+    return [''.join(row) for row in grid]
+
+
+def build_corpus() -> List[Tuple[str, List[str]]]:
+    corpus = []
+    for name in CURATED_LEVELS:
+        path = os.path.join(REPO_DIR, name)
+        if os.path.exists(path):
+            corpus.append((name, load_level(path)))
+    for rows, cols, boxes in GENERATED_SIZES:
+        corpus.append((f"room-{rows}x{cols}-{boxes}box", make_room_level(rows, cols, boxes)))
+    return corpus
+
+
+def run_benchmark(corpus: List[Tuple[str, List[str]]], repeat: int = 1, **solver_options) -> dict:
+    """
+    逐个关卡求解并记录性能指标，返回报告字典。
+
+    每次运行都放在一个全新的工作进程中，保证峰值内存互不干扰；
+    同一关卡重复 repeat 次取最短耗时，以降低计时噪声。
+    """
+    report = {'config': dict(solver_options, repeat=repeat), 'levels': {}}
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as executor:
+        for name, board_map in corpus:
+            runs = [executor.submit(solve_map, board_map, name, **solver_options).result() for _ in range(repeat)]
+            best = min(runs, key=lambda record: record['time'] if record['time'] is not None else float('inf'))
+            elapsed = best['time']
+            report['levels'][name] = {
+                'status': best['status'],
+                'moves': len(best['moves']) if best['moves'] is not None else None,
+                'pushes': best['pushes'],
+                'time': elapsed,
+                'expanded': best['expanded'],
+                'generated': best['generated'],
+                'nodes_per_second': round(best['expanded'] / elapsed) if best['expanded'] and elapsed else None,
+                'peak_memory_kb': max((record['peak_memory_kb'] or 0) for record in runs) or None,
+                'stats': best['stats'],
+            }
+    levels = report['levels'].values()
+    report['summary'] = {
+        'levels': len(report['levels']),
+        'solved': sum(1 for level in levels if level['status'] == 'solved'),
+        'total_time': round(sum(level['time'] or 0 for level in levels), 6),
+        'total_expanded': sum(level['expanded'] or 0 for level in levels),
+    }
+    return report
+
+
+def compare_reports(report: dict, baseline: dict, time_tolerance: float = 0.25, node_tolerance: float = 0.0,
+                    min_time: float = 0.05) -> List[str]:
+    """
+    与基线报告逐关卡比较，返回回归描述列表（空列表表示没有回归）。
+
+    回归包括：基线可解的关卡不再可解、解变长、扩展节点数或耗时超过基线的容差。
+    耗时低于 min_time 秒的关卡计时噪声太大，不参与耗时比较。
+    """
+    regressions = []
+    for name, old in baseline.get('levels', {}).items():
+        new = report['levels'].get(name)
+        if new is None:
+            continue
+        if old['status'] == 'solved' and new['status'] != 'solved':
+            regressions.append(f"{name}: status {old['status']} -> {new['status']}")
+            continue
+        if old['moves'] is not None and new['moves'] is not None and new['moves'] > old['moves']:
+            regressions.append(f"{name}: moves {old['moves']} -> {new['moves']}")
+        if old['expanded'] and new['expanded'] is not None and new['expanded'] > old['expanded'] * (1 + node_tolerance):
+            regressions.append(f"{name}: expanded {old['expanded']} -> {new['expanded']}")
+        if old['time'] and new['time'] is not None and new['time'] >= min_time and new['time'] > old['time'] * (1 + time_tolerance):
+            regressions.append(f"{name}: time {old['time']:.4f}s -> {new['time']:.4f}s")
+    return regressions
+
+
+def _load_json(path: str) -> Optional[dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sokoban 求解器性能基准")
+    parser.add_argument('--output', help='把本次报告写入该 JSON 文件（默认输出到标准输出）')
+    parser.add_argument('--baseline', help='与该基线报告比较，出现回归时以非零状态退出')
+    parser.add_argument('--save-baseline', help='把本次报告另存为基线文件')
+    parser.add_argument('--repeat', type=int, default=3, help='每个关卡重复运行次数，取最短耗时')
+    parser.add_argument('--time-tolerance', type=float, default=0.25, help='耗时允许超出基线的比例')
+    parser.add_argument('--node-tolerance', type=float, default=0.0, help='扩展节点数允许超出基线的比例')
+    parser.add_argument('--min-time', type=float, default=0.05, help='低于该耗时（秒）的关卡不比较耗时')
+    parser.add_argument('--push-level', action='store_true', help='使用推箱级搜索')
+    parser.add_argument('--weight', type=float, default=1, help='加权 A* 的权重')
+    parser.add_argument('--ida', action='store_true', help='使用 IDA* 求解')
+    args = parser.parse_args()
+
+    started = time.time()
+    report = run_benchmark(build_corpus(), repeat=args.repeat, push_level=args.push_level, weight=args.weight,
+                           method='solve_ida' if args.ida else 'solve')
+    report['created'] = started
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    if args.baseline:
+        regressions = compare_reports(report, _load_json(args.baseline), args.time_tolerance,
+                                      args.node_tolerance, args.min_time)
+        for line in regressions:
+            print(f"[REGRESSION] {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
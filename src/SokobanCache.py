@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from typing import List, Optional, Tuple
+
+# 默认缓存文件：用户主目录下，GUI 与批量求解共用；可用环境变量 SOKOBAN_CACHE 覆盖
+DEFAULT_CACHE_PATH = os.environ.get('SOKOBAN_CACHE') or os.path.join(os.path.expanduser('~'), '.sokoban_cache.sqlite3')
+# 缓存内容（移动序列 + 统计 JSON）的总字节数上限，超出后按最近最少使用淘汰
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_MOVE_VECTORS = {'U': (-1, 0), 'D': (1, 0), 'L': (0, -1), 'R': (0, 1)}
+_VECTOR_MOVES = {v: k for k, v in _MOVE_VECTORS.items()}
+
+
+def normalize_level(board_map: List[str]) -> List[str]:
+    """
+    规范化关卡文本：去掉行尾空白与空行，裁掉四周全为地板的行列，并把各行补齐到同一宽度。
+    只改变排版而不改变关卡本身，玩家的相对移动在规范化前后完全一致。
+    """
+    rows = [row.rstrip() for row in board_map]
+    rows = [row for row in rows if row]
+    if not rows:
+        return []
+    width = max(len(row) for row in rows)
+    rows = [row.ljust(width) for row in rows]
+    left = min(len(row) - len(row.lstrip()) for row in rows)
+    return [row[left:].rstrip().ljust(width - left) for row in rows]
+
+
+def _transform(rows: List[str], transpose: bool, flip_rows: bool, flip_cols: bool) -> Tuple[List[str], dict]:
+    # 依次转置、上下翻转、左右翻转，同时给出移动方向的对应关系（原方向 -> 新方向）
+    if transpose:
+        rows = [''.join(col) for col in zip(*rows)]
+    if flip_rows:
+        rows = rows[::-1]
+    if flip_cols:
+        rows = [row[::-1] for row in rows]
+    mapping = {}
+    for move, (dr, dc) in _MOVE_VECTORS.items():
+        if transpose:
+            dr, dc = dc, dr
+        if flip_rows:
+            dr = -dr
+        if flip_cols:
+            dc = -dc
+        mapping[move] = _VECTOR_MOVES[(dr, dc)]
+    return rows, mapping
+
+
+def canonical_level(board_map: List[str], symmetry: bool = True) -> Tuple[str, dict]:
+    """
+    返回 (规范关卡哈希, 方向映射)。
+
+    symmetry=True 时在 8 种旋转/镜像中取文本字典序最小者，使同一关卡的各种朝向共用一条缓存；
+    方向映射把原关卡中的移动方向换算到规范朝向。
+    """
+    rows = normalize_level(board_map)
+    flags = [(t, fr, fc) for t in (False, True) for fr in (False, True) for fc in (False, True)] if symmetry else [(False, False, False)]
+    best_text, best_mapping = None, None
+    for flag in flags:
+        variant, mapping = _transform(rows, *flag)
+        text = '\n'.join(variant)
+        if best_text is None or text < best_text:
+            best_text, best_mapping = text, mapping
+    return hashlib.sha256(best_text.encode('utf-8')).hexdigest(), best_mapping
+
+
+def _map_moves(moves: str, mapping: dict) -> str:
+    # 按方向映射换算移动序列，保留大小写（大写为推箱）
+    return ''.join(mapping[m.upper()].lower() if m.islower() else mapping[m] for m in moves)
+
+
+def config_key(**options) -> str:
+    """求解配置的规范文本（如 method、push_level、weight），同一关卡不同配置的结果分开缓存。"""
+    return json.dumps(options, sort_keys=True)
+
+
+class SolutionCache:
+    """
+    基于 sqlite 的持久化求解结果缓存，以 (规范关卡哈希, 求解配置) 为键，
+    保存移动序列（按规范朝向存储）、搜索统计与求解配置。
+
+    缓存只是加速手段：数据库不可用、被锁或损坏时，读写失败一律视为未命中，不影响求解。
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES, symmetry: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.symmetry = symmetry
+        self._conn = None
+        try:
+            # 批量求解时多个工作进程会同时写入，等待锁而不是立即失败
+            self._conn = sqlite3.connect(path, timeout=30)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS solutions ("
+                " level_hash TEXT NOT NULL, config TEXT NOT NULL, status TEXT NOT NULL,"
+                " moves TEXT, stats TEXT, size INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL,"
+                " PRIMARY KEY (level_hash, config))")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)")
+            self._conn.commit()
+        except sqlite3.Error:
+            self.close()
+
+    def get(self, board_map: List[str], config: str) -> Optional[dict]:
+        """
+        查找缓存，命中时返回 {'status', 'moves', 'stats', 'config'}，moves 已换算回该关卡自身的朝向
+        （无解时为 None）；未命中返回 None。
+        """
+        if self._conn is None:
+            return None
+        level_hash, mapping = canonical_level(board_map, self.symmetry)
+        try:
+            row = self._conn.execute("SELECT status, moves, stats FROM solutions WHERE level_hash = ? AND config = ?",
+                                     (level_hash, config)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE solutions SET last_used = ? WHERE level_hash = ? AND config = ?",
+                               (time.time(), level_hash, config))
+            self._conn.commit()
+        except sqlite3.Error:
+            return None
+        status, moves, stats = row
+        if moves is not None:
+            inverse = {v: k for k, v in mapping.items()}
+            moves = _map_moves(moves, inverse)
+        return {'status': status, 'moves': moves, 'stats': json.loads(stats) if stats else None, 'config': config}
+
+    def put(self, board_map: List[str], config: str, moves: Optional[str], stats: Optional[dict] = None,
+            status: str = 'solved') -> None:
+        """写入一条结果（无解时 moves 为 None，status 为 'unsolvable'），随后按总大小淘汰旧条目。"""
+        if self._conn is None:
+            return
+        level_hash, mapping = canonical_level(board_map, self.symmetry)
+        stored_moves = _map_moves(moves, mapping) if moves is not None else None
+        stats_text = json.dumps(stats) if stats is not None else None
+        size = len(stored_moves or '') + len(stats_text or '')
+        now = time.time()
+        try:
+            self._conn.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (level_hash, config, status, stored_moves, stats_text, size, now, now))
+            self._evict()
+            self._conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def _evict(self) -> None:
+        # 总大小超出上限时，按 last_used 从旧到新删除，直到回到上限以内
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM solutions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for level_hash, config, size in self._conn.execute(
+                "SELECT level_hash, config, size FROM solutions ORDER BY last_used"):
+            victims.append((level_hash, config))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM solutions WHERE level_hash = ? AND config = ?", victims)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
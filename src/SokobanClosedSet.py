@@ -0,0 +1,240 @@
+import os
+import mmap
+import heapq
+import shutil
+import struct
+import tempfile
+import weakref
+
+# 溢出块中每条记录在键之后的部分：g 值与该状态在父指针日志中的偏移
+_VALUE = struct.Struct('>IQ')
+# 父指针日志的记录：父状态的偏移与编码后的动作
+_LINK = struct.Struct('>QI')
+# 尚未写入父指针日志（未被扩展过）的状态的偏移
+NO_OFFSET = (1 << 64) - 1
+# 逐步移动的编码顺序；推箱动作编码为 8 + 箱子格子 * 4 + 方向
+_STEP_CODES = 'UDLRudlr'
+
+
+class DiskClosedSet:
+    """
+    可溢出到磁盘的 visited / parent_map 后端，供 A* 在内存不足时用磁盘 I/O 换内存。
+
+    最近写入的状态保存在内存字典 key -> (g, 偏移) 中，条目数达到 memory_limit 时按键排序
+    写成一个定长记录的块文件（键按大端定宽编码，排序后的字节序与整数大小一致），以 mmap
+    只读映射后二分查找；块数达到 MERGE_THRESHOLD 时多路归并为一个块，同一键只保留最新的记录。
+    查询依次看内存字典与各块（由新到旧，越新的 g 越小），块之前有一个 Bloom 过滤器，
+    绝大多数新状态不必访问磁盘即可判定不存在。
+
+    父指针不保存父状态的键，而是写入追加式的日志文件：每个被扩展的状态在日志中占一条
+    (父状态的记录号, 动作编码) 记录，其记录号即偏移，回溯路径时顺着偏移读取即可。
+    对外提供 _astar 用到的映射接口：get / [] / []= / len，以及 parents[key] = (父 key, move)。
+    """
+
+    MERGE_THRESHOLD = 8
+    BLOOM_HASHES = 3
+
+    def __init__(self, solver, directory=None, memory_limit=1 << 20, bloom_bits=1 << 27):
+        self.solver = solver
+        self.key_bytes = (solver.size + solver.size.bit_length() + 7) // 8
+        self.record_size = self.key_bytes + _VALUE.size
+        self.memory_limit = memory_limit
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix='sokoban-closed-', dir=directory)
+        self.memory = {}
+        self.chunks = []  # [(文件, mmap, 记录数)]，由旧到新
+        self.chunk_entries = 0
+        self.next_chunk = 0
+        self.bloom = bytearray(bloom_bits // 8)
+        self.bloom_bits = bloom_bits
+        self.log = open(os.path.join(self.directory, 'parents.bin'), 'w+b')
+        self.log_size = 0
+        # 宏动作长度不定，单独保存在内存中，编码为 push_base 之后的下标
+        self.push_base = len(_STEP_CODES) + 4 * solver.size
+        self.macros = []
+        self.parents = _ParentLog(self)
+        self.stats = {'spills': 0, 'merges': 0, 'disk_lookups': 0}
+        self._finalizer = weakref.finalize(self, _cleanup, self.log, self.chunks, self.directory)
+
+    def close(self):
+        """关闭并删除所有块文件与日志。"""
+        self._finalizer()
+
+    def __len__(self):
+        # 不同块之间可能有同一状态的旧记录，合并前略大于实际状态数
+        return len(self.memory) + self.chunk_entries
+
+    def _bloom_positions(self, key):
+        h = hash(key) * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, h >> 32 | 1
+        return [(h1 + i * h2) % self.bloom_bits for i in range(self.BLOOM_HASHES)]
+
+    def _find(self, key):
+        # 返回某状态最新的 (g, 偏移)，不存在时返回 None；偏移为 NO_OFFSET 时继续向旧块查找偏移
+        value = self.memory.get(key)
+        if value is not None and value[1] != NO_OFFSET:
+            return value
+        if not self.chunks:
+            return value
+        bloom = self.bloom
+        for pos in self._bloom_positions(key):
+            if not bloom[pos >> 3] >> (pos & 7) & 1:
+                return value
+        self.stats['disk_lookups'] += 1
+        encoded = key.to_bytes(self.key_bytes, 'big')
+        size, width = self.record_size, self.key_bytes
+        for _, data, count in reversed(self.chunks):
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if data[mid * size:mid * size + width] < encoded:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo < count and data[lo * size:lo * size + width] == encoded:
+                g, offset = _VALUE.unpack_from(data, lo * size + width)
+                if value is None:
+                    value = (g, offset)
+                    if offset != NO_OFFSET:
+                        return value
+                elif offset != NO_OFFSET:
+                    return value[0], offset
+        return value
+
+    def get(self, key, default=None):
+        value = self._find(key)
+        return default if value is None else value[0]
+
+    def __getitem__(self, key):
+        value = self._find(key)
+        if value is None:
+            raise KeyError(key)
+        return value[0]
+
+    def __setitem__(self, key, g):
+        old = self.memory.get(key)
+        self.memory[key] = (g, NO_OFFSET if old is None else old[1])
+        if len(self.memory) >= self.memory_limit:
+            self._spill()
+
+    def _spill(self):
+        # 内存字典按键排序写成一个新块，并登记到 Bloom 过滤器
+        width, bloom = self.key_bytes, self.bloom
+        path = os.path.join(self.directory, f'chunk-{self.next_chunk}.bin')
+        self.next_chunk += 1
+        with open(path, 'wb') as f:
+            for key in sorted(self.memory):
+                g, offset = self.memory[key]
+                f.write(key.to_bytes(width, 'big') + _VALUE.pack(g, offset))
+                for pos in self._bloom_positions(key):
+                    bloom[pos >> 3] |= 1 << (pos & 7)
+        self._open_chunk(path, len(self.memory))
+        self.memory.clear()
+        self.stats['spills'] += 1
+        if len(self.chunks) >= self.MERGE_THRESHOLD:
+            self._merge()
+
+    def _open_chunk(self, path, count):
+        f = open(path, 'rb')
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.chunks.append((f, data, count))
+        self.chunk_entries += count
+
+    def _records(self, age, data, count):
+        # 按键升序产出 (键字节, -块序号, g, 偏移)，同键时较新的块排在前面
+        size, width = self.record_size, self.key_bytes
+        for i in range(count):
+            start = i * size
+            g, offset = _VALUE.unpack_from(data, start + width)
+            yield data[start:start + width], -age, g, offset
+
+    def _merge(self):
+        """把所有块多路归并为一个块：同一键取最新的 g，以及最新的已知偏移。"""
+        path = os.path.join(self.directory, f'chunk-{self.next_chunk}.bin')
+        self.next_chunk += 1
+        count = 0
+        with open(path, 'wb') as out:
+            current = None
+            merged = heapq.merge(*(self._records(age, data, n) for age, (_, data, n) in enumerate(self.chunks)))
+            for encoded, _, g, offset in merged:
+                if current is not None and current[0] == encoded:
+                    if current[2] == NO_OFFSET:
+                        current[2] = offset
+                    continue
+                if current is not None:
+                    out.write(current[0] + _VALUE.pack(current[1], current[2]))
+                    count += 1
+                current = [encoded, g, offset]
+            if current is not None:
+                out.write(current[0] + _VALUE.pack(current[1], current[2]))
+                count += 1
+        _close_chunks(self.chunks)
+        self.chunks.clear()
+        self.chunk_entries = 0
+        self._open_chunk(path, count)
+        self.stats['merges'] += 1
+
+    def _encode_move(self, move):
+        if move.__class__ is list:
+            self.macros.append(move)
+            return self.push_base + len(self.macros) - 1
+        if move.__class__ is tuple:
+            box, name = move
+            return len(_STEP_CODES) + box * 4 + self.solver.move_names.index(name)
+        return _STEP_CODES.index(move)
+
+    def _decode_move(self, code):
+        if code >= self.push_base:
+            return self.macros[code - self.push_base]
+        if code >= len(_STEP_CODES):
+            box, d = divmod(code - len(_STEP_CODES), 4)
+            return box, self.solver.move_names[d]
+        return _STEP_CODES[code]
+
+    def record(self, key, parent_key, move):
+        """把刚被扩展的状态写入父指针日志，并在其记录上登记日志偏移。"""
+        parent = self._find(parent_key)
+        self.log.write(_LINK.pack(parent[1], self._encode_move(move)))
+        offset = self.log_size
+        self.log_size += 1
+        g = self._find(key)[0]
+        self.memory[key] = (g, offset)
+        if len(self.memory) >= self.memory_limit:
+            self._spill()
+
+    def path(self, key):
+        """从某状态沿日志偏移回溯到起点，返回 (未补全的) 动作序列。"""
+        value = self._find(key)
+        offset = NO_OFFSET if value is None else value[1]
+        self.log.flush()
+        moves = []
+        while offset != NO_OFFSET:
+            self.log.seek(offset * _LINK.size)
+            offset, code = _LINK.unpack(self.log.read(_LINK.size))
+            moves.append(self._decode_move(code))
+        self.log.seek(0, os.SEEK_END)
+        moves.reverse()
+        return moves
+
+
+class _ParentLog:
+    # 让 _astar 照常写 parent_map[key] = (父 key, move)，实际写入 DiskClosedSet 的日志
+    def __init__(self, closed_set):
+        self.closed_set = closed_set
+
+    def __setitem__(self, key, link):
+        self.closed_set.record(key, *link)
+
+
+def _close_chunks(chunks):
+    for f, data, _ in chunks:
+        data.close()
+        f.close()
+        os.remove(f.name)
+
+
+def _cleanup(log, chunks, directory):
+    log.close()
+    _close_chunks(chunks)
+    shutil.rmtree(directory, ignore_errors=True)
@@ -2,12 +2,14 @@ from __future__ import annotations
 
 import tkinter as tk
 from tkinter import messagebox, filedialog
-import random
 from typing import List, Tuple, Set, Any
 from sokoban_types import SokobanGUIProtocol
 from SokobanSolver import SokobanSolver
+from SokobanWorker import GenerateJob
 
-_last_random_params = {'walls': None, 'boxes': None, 'targets': None}
+_last_random_params = {'walls': None, 'boxes': None, 'min_pushes': None}
+# 后台生成关卡时轮询结果的间隔（毫秒）
+_GENERATE_POLL_MS = 100
 
 def save_scene(gui: SokobanGUIProtocol) -> None:
     file_path = filedialog.asksaveasfilename(title="保存场景为", defaultextension=".txt", filetypes=[("Text Files","*.txt"), ("All Files","*.*")])
@@ -122,7 +124,7 @@ def prompt_random_map(gui: SokobanGUIProtocol) -> None:
     global _last_random_params
     default_walls = _last_random_params['walls'] if _last_random_params['walls'] is not None else max(0, inner_cells // 6)
     default_boxes = _last_random_params['boxes'] if _last_random_params['boxes'] is not None else 1
-    default_targets = _last_random_params['targets'] if _last_random_params['targets'] is not None else 1
+    default_pushes = _last_random_params['min_pushes'] if _last_random_params['min_pushes'] is not None else 0
 
     tk.Label(dlg, text="墙数量:").grid(row=1, column=0, padx=6, pady=6)
     walls_var = tk.IntVar(value=default_walls)
@@ -130,27 +132,57 @@ def prompt_random_map(gui: SokobanGUIProtocol) -> None:
 
     tk.Label(dlg, text="箱子数量:").grid(row=1, column=2, padx=6, pady=6)
     boxes_var = tk.IntVar(value=default_boxes)
-    tk.Spinbox(dlg, from_=0, to=inner_cells, textvariable=boxes_var, width=6).grid(row=1, column=3, padx=6, pady=6)
+    tk.Spinbox(dlg, from_=1, to=inner_cells, textvariable=boxes_var, width=6).grid(row=1, column=3, padx=6, pady=6)
 
-    tk.Label(dlg, text="目标数量:").grid(row=2, column=0, padx=6, pady=6)
-    targets_var = tk.IntVar(value=default_targets)
-    tk.Spinbox(dlg, from_=0, to=inner_cells, textvariable=targets_var, width=6).grid(row=2, column=1, padx=6, pady=6)
+    tk.Label(dlg, text="最少推箱数:").grid(row=2, column=0, padx=6, pady=6)
+    pushes_var = tk.IntVar(value=default_pushes)
+    tk.Spinbox(dlg, from_=0, to=999, textvariable=pushes_var, width=6).grid(row=2, column=1, padx=6, pady=6)
+
+    progress_label = tk.Label(dlg, text="")
+    progress_label.grid(row=4, column=0, columnspan=4, padx=6, pady=(0, 6))
+    # 后台生成任务（生成期间非空）
+    job = None
+
+    def on_generated(record):
+        new_map = record['map']
+        gui.initial_map = new_map
+        gui.current_map = [list(row) for row in new_map]
+        gui.solver = SokobanSolver(gui.initial_map, debug=getattr(gui, 'debug', False))
+        gui.reset_game()
+        kind = "最优解" if record['optimal'] else "已知解"
+        note = "" if record['target_met'] else "，未达到最少推箱数"
+        gui.status_label.config(text=f"状态: 已生成可解关卡（{kind} {record['pushes']} 次推箱{note}）")
+        dlg.destroy()
+
+    def poll():
+        nonlocal job
+        if job is None:
+            return
+        for message in job.poll():
+            job.finish()
+            job = None
+            if message[0] == 'done':
+                on_generated(message[1])
+            else:
+                progress_label.config(text="")
+                generate_button.config(state=tk.NORMAL)
+                messagebox.showwarning("生成失败", message[1], parent=dlg)
+            return
+        gui.master.after(_GENERATE_POLL_MS, poll)
 
     def on_confirm():
+        nonlocal job
         try:
             walls = int(walls_var.get())
             boxes = int(boxes_var.get())
-            targets = int(targets_var.get())
+            min_pushes = int(pushes_var.get())
         except Exception as e:
             messagebox.showerror("输入错误", f"请输入有效整数: {e}", parent=dlg)
             return
-        if walls < 0 or boxes < 0 or targets < 0:
-            messagebox.showwarning("输入错误", "请确保数量为非负整数", parent=dlg)
-            return
-        if targets < boxes:
-            messagebox.showwarning("输入错误", "目标点数量应 >= 箱子数量以保证可解， 请调整。", parent=dlg)
+        if walls < 0 or boxes < 1 or min_pushes < 0:
+            messagebox.showwarning("输入错误", "请确保墙与推箱数为非负整数，且至少有一个箱子", parent=dlg)
             return
-        required = 1 + boxes + targets
+        required = 1 + boxes
         if required + walls > inner_cells:
             messagebox.showwarning("输入错误", f"指定数量超出可用内部格数 ({inner_cells})，请减少数量", parent=dlg)
             return
@@ -159,77 +191,27 @@ def prompt_random_map(gui: SokobanGUIProtocol) -> None:
         global _last_random_params
         _last_random_params['walls'] = walls
         _last_random_params['boxes'] = boxes
-        _last_random_params['targets'] = targets
-
-        inner_positions = [(r, c) for r in range(1, gui.rows-1) for c in range(1, gui.cols-1)]
-        player_pos = random.choice(inner_positions)
-        remaining = set(inner_positions)
-        remaining.remove(player_pos)
-
-        boxes_pos = set()
-        if boxes > 0:
-            rem_list = list(remaining)
-            if boxes > len(rem_list):
-                messagebox.showwarning("输入错误", f"请求的箱子数量超出可选位置 ({len(rem_list)})", parent=dlg)
-                return
-            boxes_pos = set(random.sample(rem_list, boxes))
-            for p in boxes_pos:
-                remaining.remove(p)
-
-        targets_pos = set()
-        if targets > 0:
-            rem_list = list(remaining)
-            if targets > len(rem_list):
-                messagebox.showwarning("输入错误", f"请求的目标数量超出可选位置 ({len(rem_list)})", parent=dlg)
-                return
-            targets_pos = set(random.sample(rem_list, targets))
-            for p in targets_pos:
-                remaining.remove(p)
-
-        walls_pos = set()
-        if walls > 0:
-            rem_list = list(remaining)
-            if walls > len(rem_list):
-                messagebox.showwarning("输入错误", f"请求的墙数量超出可选位置 ({len(rem_list)})", parent=dlg)
-                return
-            walls_pos = set(random.sample(rem_list, walls))
-            for p in walls_pos:
-                remaining.remove(p)
-
-        new_map = []
-        for r in range(gui.rows):
-            if r == 0 or r == gui.rows - 1:
-                new_map.append('#' * gui.cols)
-            else:
-                row = []
-                for c in range(gui.cols):
-                    if c == 0 or c == gui.cols - 1:
-                        row.append('#')
-                    else:
-                        if (r, c) in walls_pos:
-                            row.append('#')
-                        elif (r, c) in boxes_pos:
-                            row.append(gui.solver.BOX_ON_TARGET if (r, c) in targets_pos else gui.solver.BOX)
-                        elif (r, c) in targets_pos:
-                            row.append(gui.solver.TARGET)
-                        elif (r, c) == player_pos:
-                            row.append(gui.solver.PLAYER_ON_TARGET if (r, c) in targets_pos else gui.solver.PLAYER)
-                        else:
-                            row.append(gui.solver.FLOOR)
-                new_map.append(''.join(row))
+        _last_random_params['min_pushes'] = min_pushes
 
-        gui.initial_map = new_map
-        gui.current_map = [list(row) for row in new_map]
-        gui.solver = SokobanSolver(gui.initial_map, debug=getattr(gui, 'debug', False))
-        gui.reset_game()
-        dlg.destroy()
+        # 从箱子全在目标点上的终局反向拉箱子生成，关卡按构造必然可解（目标点数量与箱子相同）；
+        # 每次尝试都要做推箱级验证求解，在后台进程中进行，主线程通过 after 轮询结果
+        generate_button.config(state=tk.DISABLED)
+        progress_label.config(text="正在生成关卡...")
+        job = GenerateJob(gui.rows, gui.cols, boxes, walls=walls, min_pushes=min_pushes)
+        gui.master.after(_GENERATE_POLL_MS, poll)
 
     def on_cancel():
+        nonlocal job
+        if job is not None:
+            job.cancel()
+            job = None
         dlg.destroy()
 
     btn_frame = tk.Frame(dlg)
     btn_frame.grid(row=3, column=0, columnspan=4, pady=6)
-    tk.Button(btn_frame, text="生成", command=on_confirm).pack(side=tk.LEFT, padx=6)
+    generate_button = tk.Button(btn_frame, text="生成", command=on_confirm)
+    generate_button.pack(side=tk.LEFT, padx=6)
     tk.Button(btn_frame, text="取消", command=on_cancel).pack(side=tk.LEFT, padx=6)
+    dlg.protocol("WM_DELETE_WINDOW", on_cancel)
 
     gui.master.wait_window(dlg)
@@ -4,9 +4,17 @@ import random
 from typing import List, Tuple, Set, Optional, Any
 from SokobanSolver import SokobanSolver
 from SokobanDialogs import save_scene, import_scene, prompt_resize_board, prompt_random_map
-from SokobanView import draw_tile, draw_board
+from SokobanView import draw_tile, BoardView
+from SokobanWorker import SolveJob
+from SokobanCache import SolutionCache, config_key
+from SokobanPlayback import Playback
 
 class SokobanGUI:
+    # 后台求解时轮询进度与结果的间隔（毫秒）
+    SOLVE_POLL_MS = 100
+    # GUI 求解使用默认配置（逐步移动的最优 A*），缓存按此配置存取
+    SOLVE_CONFIG = config_key(method='solve', push_level=False, weight=1)
+
     def __init__(self, master: tk.Tk, initial_map: List[str], debug: bool = False) -> None:
         self.master = master
         master.title("Sokoban Solver")
@@ -19,15 +27,23 @@ class SokobanGUI:
         self.tile_size = 40
         self.debug = debug
 
-        # 求解/播放状态
+        # 求解/播放状态：playback 为解的回放引擎（找到解后非空），autoplay_id 为自动播放的 after 任务
         self.solution_steps = []
-        self.step_index = 0
+        self.playback = None
+        self.autoplay_id = None
+        self._syncing_seek = False
         self.playing = False
+        # 后台求解任务（求解期间非空）
+        self.solve_job = None
+        # 持久化求解缓存，第一次求解时再打开
+        self.solution_cache = None
 
         # 画布
         self.canvas = tk.Canvas(master, width=self.cols * self.tile_size, height=self.rows * self.tile_size)
         self.canvas.pack(padx=10, pady=10)
         self.canvas.bind("<Button-1>", self.on_canvas_click)
+        # 增量绘制：只重绘内容发生变化的格子
+        self.board_view = BoardView(self.canvas, self.tile_size)
 
 
         # 控件栏分为两行
@@ -54,6 +70,9 @@ class SokobanGUI:
         self.solve_button = tk.Button(control_frame2, text="求解 (A*)", command=self.start_solve)
         self.solve_button.pack(side=tk.LEFT, padx=5)
 
+        self.cancel_button = tk.Button(control_frame2, text="取消求解", command=self.cancel_solve, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+
         self.prev_button = tk.Button(control_frame2, text="上一步", command=self.prev_step, state=tk.DISABLED)
         self.prev_button.pack(side=tk.LEFT, padx=5)
 
@@ -66,6 +85,25 @@ class SokobanGUI:
         self.help_button = tk.Button(control_frame2, text="帮助", command=self.show_help)
         self.help_button.pack(side=tk.LEFT, padx=5)
 
+        # 第三行：自动播放、播放速度（步/秒）、回放进度
+        control_frame3 = tk.Frame(master)
+        control_frame3.pack(pady=2)
+
+        self.autoplay_button = tk.Button(control_frame3, text="自动播放", command=self.toggle_autoplay, state=tk.DISABLED)
+        self.autoplay_button.pack(side=tk.LEFT, padx=5)
+
+        tk.Label(control_frame3, text="速度").pack(side=tk.LEFT)
+        self.speed_var = tk.IntVar(value=5)
+        self.speed_scale = tk.Scale(control_frame3, from_=1, to=50, orient=tk.HORIZONTAL, variable=self.speed_var,
+                                    length=100, showvalue=True)
+        self.speed_scale.pack(side=tk.LEFT, padx=5)
+
+        tk.Label(control_frame3, text="进度").pack(side=tk.LEFT)
+        self.seek_var = tk.IntVar(value=0)
+        self.seek_scale = tk.Scale(control_frame3, from_=0, to=0, orient=tk.HORIZONTAL, variable=self.seek_var,
+                                   length=200, showvalue=True, command=self.seek_step, state=tk.DISABLED)
+        self.seek_scale.pack(side=tk.LEFT, padx=5)
+
         self.status_label = tk.Label(master, text="状态: 等待求解")
         self.status_label.pack(pady=5)
 
@@ -79,9 +117,11 @@ class SokobanGUI:
             "2. 地图编辑完成后，点击‘求解(A*)’自动计算最优解。\n"
             "3. ‘上一步’/‘下一步’可逐步回放解题过程，‘重置’恢复初始状态。\n"
             "4. ‘保存地图’/‘导入地图’可保存和加载地图(txt格式)。\n"
-            "5. ‘重设地图大小’可自定义行列数，‘随机生成地图’可生成随机地图。\n"
+            "5. ‘重设地图大小’可自定义行列数，‘随机生成地图’可生成必然可解的随机地图，并可指定最少推箱数。\n"
             "6. 目标点数量需不少于箱子数。所有箱子均位于目标点上，则游戏胜利。\n"
             "7. 求解时，括号内大写字母表示推箱子，小写字母表示仅玩家移动。\n"
+            "8. 求解在后台进行，状态栏实时显示进度，可随时点击‘取消求解’中止。\n"
+            "9. 找到解后可点击‘自动播放’按设定速度（步/秒）回放，或拖动‘进度’条跳到任意一步。\n"
             "\n"
         )
         messagebox.showinfo("操作指南", help_text)
@@ -92,8 +132,8 @@ class SokobanGUI:
     
         编辑模式由 "是否存在解" 控制：未求解时可编辑，已求解/播放期间禁用编辑。
         """
-        # 只有未求解时允许编辑
-        if self.solution_steps:
+        # 只有未求解且不在求解过程中时允许编辑
+        if self.solution_steps or self.playing:
             return
 
         c = event.x // self.tile_size
@@ -225,133 +265,173 @@ class SokobanGUI:
         return draw_tile(self.canvas, self.solver, self.tile_size, r, c, tile_type)
 
     def _draw_board(self) -> None:
-        return draw_board(self.canvas, self.rows, self.cols, self.current_map, self.solver, self.tile_size)
+        return self.board_view.render(self.current_map, self.solver)
 
     def start_solve(self) -> None:
         if self.solution_steps != []:
             return
-        # 求解前验证地图合法性：必须存在玩家，且目标点数量 >= 箱子数量
-        player_exists = False
-        box_count = 0
-        target_count = 0
-        for r in range(self.rows):
-            for c in range(self.cols):
-                ch = self.current_map[r][c]
-                if ch == self.solver.PLAYER or ch == self.solver.PLAYER_ON_TARGET:
-                    player_exists = True
-                if ch == self.solver.BOX or ch == self.solver.BOX_ON_TARGET:
-                    box_count += 1
-                if ch == self.solver.TARGET or ch == self.solver.BOX_ON_TARGET or ch == self.solver.PLAYER_ON_TARGET:
-                    target_count += 1
-
-        if not player_exists:
-            messagebox.showwarning("地图不合法", "地图中没有玩家，请先放置一个玩家 (@)")
+        # 求解前做静态可行性检查：地图不合法时提示修改，明显无解时无需搜索直接给出原因
+        infeasible = self.solver.check_feasibility()
+        if infeasible is not None:
+            code, message = infeasible
+            if code in ('no_player', 'too_few_targets'):
+                messagebox.showwarning("地图不合法", message)
+                return
+            self.status_label.config(text=f"状态: 失败 (无解：{message})")
             return
-        if target_count < box_count:
-            messagebox.showwarning("地图不合法", "目标点数量少于箱子数量，请增加目标点或减少箱子")
+
+        # 同一关卡（含旋转/镜像）求解过则直接使用缓存结果
+        if self.solution_cache is None:
+            self.solution_cache = SolutionCache()
+        cached = self.solution_cache.get(self.initial_map, self.SOLVE_CONFIG)
+        if cached is not None:
+            self._finish_solve(list(cached['moves']) if cached['moves'] is not None else None)
+            self.status_label.config(text=self.status_label.cget("text") + "（来自缓存）")
             return
 
         self.status_label.config(text="状态: 正在求解...")
         # 进入求解/播放状态时，标记为播放中以禁止编辑
         self.playing = True
         self.solve_button.config(state=tk.DISABLED)
-        self.master.update()
-        try:
-            solution = self.solver.solve()
-        finally:
-            # 无论是否求解成功，播放标志在求解结束后关闭（解存在时保持 solution_steps 控制编辑）
-            self.playing = False
+        self.cancel_button.config(state=tk.NORMAL)
+        # 在后台进程中求解，主线程通过 after 轮询进度与结果，界面保持响应
+        self.solve_job = SolveJob(self.initial_map, debug=self.debug)
+        self.master.after(self.SOLVE_POLL_MS, self._poll_solve)
+
+    def _poll_solve(self) -> None:
+        job = self.solve_job
+        if job is None:
+            return
+        for message in job.poll():
+            if message[0] == 'progress':
+                stats = message[1]
+                self.status_label.config(
+                    text=f"状态: 正在求解... 已扩展 {stats['expanded']} 个节点，用时 {stats['time_total']:.1f} 秒")
+            elif message[0] == 'done':
+                job.finish()
+                path, stats = message[1], message[2]
+                self.solution_cache.put(self.initial_map, self.SOLVE_CONFIG,
+                                        ''.join(path) if path is not None else None, stats,
+                                        'solved' if path is not None else 'unsolvable')
+                self._finish_solve(path)
+                return
+            else:
+                job.finish()
+                self._finish_solve(None, error=message[1])
+                return
+        self.master.after(self.SOLVE_POLL_MS, self._poll_solve)
+
+    def _finish_solve(self, solution: Optional[List[str]], error: Optional[str] = None) -> None:
+        # 无论是否求解成功，播放标志在求解结束后关闭（解存在时保持 solution_steps 控制编辑）
+        self.solve_job = None
+        self.playing = False
+        self.cancel_button.config(state=tk.DISABLED)
 
-        if solution is None:
+        if error is not None:
+            self.solution_steps = []
+            self.status_label.config(text=f"状态: 求解出错 ({error})")
+        elif solution is None:
             self.solution_steps = solution
             self.status_label.config(text="状态: 失败 (无解)")
             # 求解失败，用户仍可编辑（通过没有 solution_steps 来允许）
-            pass
         else:
             self.solution_steps = solution
-            self.step_index = 0
+            self.playback = Playback(self.initial_map, solution)
+            self.current_map = self.playback.grid
+            self._draw_board()
+            self._update_playback_controls()
             self.status_label.config(text=f"状态: 找到解，共 {len(solution)} 步")
-            self.next_button.config(state=tk.NORMAL)
+            self.autoplay_button.config(state=tk.NORMAL)
+            self.seek_scale.config(state=tk.NORMAL)
 
         # 如果找到了解，保持编辑禁用直到重置；否则（无解）允许编辑
         self.solve_button.config(state=tk.NORMAL)
 
-    def _apply_move(self, current_map: List[List[str]], move: str) -> List[List[str]]:
-        pr, pc = -1, -1
-        for r in range(self.rows):
-            for c in range(self.cols):
-                if current_map[r][c] in [self.solver.PLAYER, self.solver.PLAYER_ON_TARGET]:
-                    pr, pc = r, c
-                    break
-            if pr != -1: break
-        if pr == -1:
-            # 未找到玩家时直接返回原地图（保持类型为 list of lists）
-            return current_map
-        dr, dc = 0, 0
-        if move.upper() == 'U': dr = -1
-        elif move.upper() == 'D': dr = 1
-        elif move.upper() == 'L': dc = -1
-        elif move.upper() == 'R': dc = 1
-        npr, npc = pr + dr, pc + dc
-        new_map = [list(row) for row in current_map]
-        if new_map[pr][pc] == self.solver.PLAYER:
-            new_map[pr][pc] = self.solver.FLOOR
-        elif new_map[pr][pc] == self.solver.PLAYER_ON_TARGET:
-            new_map[pr][pc] = self.solver.TARGET
-        if move.isupper():
-            nbr, nbc = npr + dr, npc + dc
-            if new_map[npr][npc] == self.solver.BOX:
-                new_map[npr][npc] = self.solver.PLAYER
-            elif new_map[npr][npc] == self.solver.BOX_ON_TARGET:
-                new_map[npr][npc] = self.solver.PLAYER_ON_TARGET
-            if new_map[nbr][nbc] == self.solver.FLOOR:
-                new_map[nbr][nbc] = self.solver.BOX
-            elif new_map[nbr][nbc] == self.solver.TARGET:
-                new_map[nbr][nbc] = self.solver.BOX_ON_TARGET
-        else:
-            if new_map[npr][npc] == self.solver.FLOOR:
-                new_map[npr][npc] = self.solver.PLAYER
-            elif new_map[npr][npc] == self.solver.TARGET:
-                new_map[npr][npc] = self.solver.PLAYER_ON_TARGET
-        return new_map
+    def cancel_solve(self) -> None:
+        if self.solve_job is None:
+            return
+        self.solve_job.cancel()
+        self.solve_job = None
+        self.playing = False
+        self.solution_steps = []
+        self.cancel_button.config(state=tk.DISABLED)
+        self.solve_button.config(state=tk.NORMAL)
+        self.status_label.config(text="状态: 已取消求解")
 
     def next_step(self) -> None:
-        if self.step_index < len(self.solution_steps):
-            move = self.solution_steps[self.step_index]
-            self.current_map = self._apply_move(self.current_map, move)
-            self._draw_board()
-            self.step_index += 1
-            self.status_label.config(text=f"状态: 步数 {self.step_index}/{len(self.solution_steps)} ({move})")
-            self.prev_button.config(state=tk.NORMAL)
-            if self.step_index == len(self.solution_steps):
-                self.next_button.config(state=tk.DISABLED)
-    
-    def prev_step(self) -> None:
-        if self.step_index <= 0:
+        if self.playback is None or self.playback.index >= len(self.playback):
             return
+        move = self.solution_steps[self.playback.index]
+        self.board_view.update_cells(self.current_map, self.solver, self.playback.step_forward())
+        self._update_playback_controls(move)
 
-        new_index = self.step_index - 1
-
-        # 从初始地图重放 new_index 步以得到目标地图状态
-        temp_map = [list(row) for row in self.initial_map]
-        for i in range(new_index):
-            temp_map = self._apply_move(temp_map, self.solution_steps[i])
+    def prev_step(self) -> None:
+        if self.playback is None or self.playback.index <= 0:
+            return
+        # 撤销上一步的增量，无需从初始地图重放
+        self.board_view.update_cells(self.current_map, self.solver, self.playback.step_back())
+        self._update_playback_controls()
 
-        self.current_map = temp_map
-        self.step_index = new_index
-        self._draw_board()
+    def seek_step(self, value: str) -> None:
+        # 进度条拖动：借助关键帧直接跳到指定步数
+        if self.playback is None or self._syncing_seek:
+            return
+        index = int(float(value))
+        if index != self.playback.index:
+            self.board_view.update_cells(self.current_map, self.solver, self.playback.seek(index))
+            self._update_playback_controls()
+
+    def toggle_autoplay(self) -> None:
+        if self.autoplay_id is not None:
+            self._stop_autoplay()
+            return
+        if self.playback is None:
+            return
+        if self.playback.index >= len(self.playback):
+            self.seek_step('0')
+        self.autoplay_button.config(text="暂停")
+        self._autoplay_tick()
+
+    def _autoplay_tick(self) -> None:
+        self.next_step()
+        if self.playback is None or self.playback.index >= len(self.playback):
+            self._stop_autoplay()
+            return
+        delay = max(1, int(1000 / max(1, self.speed_var.get())))
+        self.autoplay_id = self.master.after(delay, self._autoplay_tick)
+
+    def _stop_autoplay(self) -> None:
+        if self.autoplay_id is not None:
+            self.master.after_cancel(self.autoplay_id)
+            self.autoplay_id = None
+        self.autoplay_button.config(text="自动播放")
+
+    def _update_playback_controls(self, move: Optional[str] = None) -> None:
+        index, total = self.playback.index, len(self.playback)
+        suffix = f" ({move})" if move is not None else ""
+        self.status_label.config(text=f"状态: 步数 {index}/{total}{suffix}")
+        self.next_button.config(state=tk.NORMAL if index < total else tk.DISABLED)
+        self.prev_button.config(state=tk.NORMAL if index > 0 else tk.DISABLED)
+        self._syncing_seek = True
+        self.seek_scale.config(to=total)
+        self.seek_var.set(index)
+        self._syncing_seek = False
 
-        self.status_label.config(text=f"状态: 步数 {self.step_index}/{len(self.solution_steps)}")
-        # 更新按钮状态
-        self.next_button.config(state=tk.NORMAL if self.step_index < len(self.solution_steps) else tk.DISABLED)
-        self.prev_button.config(state=tk.NORMAL if self.step_index > 0 else tk.DISABLED)
-    
     def reset_game(self) -> None:
+        # 地图被重置/替换时，正在进行的求解已失去意义
+        if self.solve_job is not None:
+            self.cancel_solve()
+        self._stop_autoplay()
         self.current_map = [list(row) for row in self.initial_map]
         self._draw_board()
-        self.step_index = 0
+        self.playback = None
         self.solution_steps = []
         self.status_label.config(text="状态: 已重置")
     # 重置后允许编辑（编辑受 solution_steps 控制，无需 edit_button）
         self.prev_button.config(state=tk.DISABLED)
         self.next_button.config(state=tk.DISABLED)
+        self.autoplay_button.config(state=tk.DISABLED)
+        self._syncing_seek = True
+        self.seek_var.set(0)
+        self.seek_scale.config(to=0, state=tk.DISABLED)
+        self._syncing_seek = False
@@ -0,0 +1,211 @@
+import os
+import sys
+import json
+import random
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from SokobanSolver import SokobanSolver
+
+# 验证最优推箱数时推箱级搜索的扩展节点上限；超出时退回构造时得到的解
+VERIFY_MAX_EXPANDED = 20000
+
+
+def _random_room(rows: int, cols: int, walls: int, rng: random.Random) -> List[List[str]]:
+    # 外围一圈墙，内部随机放置 walls 个墙块，再把不属于最大连通地板区域的格子填成墙
+    grid = [['#'] * cols] + [['#'] + [' '] * (cols - 2) + ['#'] for _ in range(rows - 2)] + [['#'] * cols]
+    inner = [(r, c) for r in range(1, rows - 1) for c in range(1, cols - 1)]
+    for r, c in rng.sample(inner, min(walls, len(inner))):
+        grid[r][c] = '#'
+    seen = set()
+    largest = set()
+    for cell in inner:
+        if grid[cell[0]][cell[1]] == '#' or cell in seen:
+            continue
+        region = {cell}
+        queue = deque([cell])
+        while queue:
+            r, c = queue.popleft()
+            for dr, dc in SokobanSolver.MOVES.values():
+                nxt = (r + dr, c + dc)
+                if grid[nxt[0]][nxt[1]] != '#' and nxt not in region:
+                    region.add(nxt)
+                    queue.append(nxt)
+        seen |= region
+        if len(region) > len(largest):
+            largest = region
+    for r, c in inner:
+        if (r, c) not in largest:
+            grid[r][c] = '#'
+    return grid
+
+
+def _render(grid: List[List[str]], targets, boxes, player) -> List[str]:
+    rows = []
+    for r, row in enumerate(grid):
+        line = []
+        for c, ch in enumerate(row):
+            cell = (r, c)
+            if ch == '#':
+                line.append('#')
+            elif cell in boxes:
+                line.append(SokobanSolver.BOX_ON_TARGET if cell in targets else SokobanSolver.BOX)
+            elif cell == player:
+                line.append(SokobanSolver.PLAYER_ON_TARGET if cell in targets else SokobanSolver.PLAYER)
+            else:
+                line.append(SokobanSolver.TARGET if cell in targets else SokobanSolver.FLOOR)
+        rows.append(''.join(line))
+    return rows
+
+
+def count_box_lines(moves: str) -> int:
+    """箱子线数：连续沿同一方向推同一个箱子（中间没有行走）算一条线，衡量解的“转折”次数。"""
+    lines = 0
+    previous = None
+    for move in moves:
+        if move.isupper() and move != previous:
+            lines += 1
+        previous = move if move.isupper() else None
+    return lines
+
+
+def _reverse_pulls(grid: List[List[str]], targets: List[Tuple[int, int]], player: Tuple[int, int], pulls: int,
+                   rng: random.Random) -> Tuple[List[str], List[Tuple[int, str]]]:
+    """
+    从“箱子全在目标点上”的终局出发随机拉箱子 pulls 次，返回 (初始关卡, 推箱序列)。
+
+    每次拉动都是某次推箱的逆操作，因此把拉动序列倒过来就是一个合法的解，关卡按构造必然可解。
+    随机游走途中记录启发函数（推箱距离匹配）最大的局面作为初始局面，它离终局最“远”。
+    推箱序列的格式与推箱级搜索相同：(箱子原格子编号, 方向)，以生成关卡的格子编号为准。
+    """
+    solved = SokobanSolver(_render(grid, set(targets), set(targets), player))
+    step, names, opposite = solved.step, solved.move_names, solved.OPPOSITE
+    boxes = solved.target_mask
+    cur = solved._index(player)
+    history = []
+    best = (0, boxes, cur, 0)  # (启发值, 箱子, 玩家, 拉动次数)
+    for _ in range(pulls):
+        reachable = solved._reachable(cur, boxes)
+        options = []
+        for box in solved._iter_boxes(boxes):
+            for d in range(4):
+                # 玩家站在箱子 d 方向的相邻格，向 d 方向后退一步，把箱子拉到自己原来的位置
+                stand = step[d][box]
+                if stand < 0 or stand not in reachable:
+                    continue
+                back = step[d][stand]
+                if back < 0 or boxes >> back & 1:
+                    continue
+                options.append((box, d, stand, back))
+        if not options:
+            break
+        box, d, stand, back = rng.choice(options)
+        boxes ^= (1 << box) | (1 << stand)
+        cur = back
+        history.append((stand, names[opposite[d]]))
+        h = solved.heuristic.estimate(boxes)
+        if h is not None and h > best[0]:
+            best = (h, boxes, cur, len(history))
+    _, boxes, cur, length = best
+    history = history[:length]
+    # 玩家起点在可达区域内随机选取，避免直接暴露最后一次拉动的位置
+    cur = rng.choice(sorted(solved._reachable(cur, boxes)))
+    box_cells = {solved._position(idx) for idx in solved._iter_boxes(boxes)}
+    level = _render(grid, set(targets), box_cells, solved._position(cur))
+    history.reverse()
+    return level, history
+
+
+def generate_level(rows: int, cols: int, boxes: int, walls: int = 0, min_pushes: int = 0, min_box_lines: int = 0,
+                   pulls: Optional[int] = None, attempts: int = 20, seed: Optional[int] = None,
+                   verify_max_expanded: int = VERIFY_MAX_EXPANDED) -> dict:
+    """
+    生成一个按构造可解的关卡，返回记录：map（关卡行列表）、solution（已知解）、pushes、box_lines、
+    optimal（solution 是否为推箱数最优）、target_met（是否达到难度目标）、seed。
+
+    每次尝试随机布置墙、目标点与玩家，从终局反向拉箱子得到初始局面，再用推箱级搜索
+    （受 verify_max_expanded 限制）求出最优推箱解来衡量难度；达到 min_pushes 与 min_box_lines
+    即返回，否则在 attempts 次尝试后返回其中最难的一个。
+    """
+    if rows < 3 or cols < 3 or boxes < 1:
+        raise ValueError("地图至少为 3x3，且至少有一个箱子")
+    if seed is None:
+        seed = random.randrange(1 << 31)
+    rng = random.Random(seed)
+    pulls = pulls or 200 * boxes
+    best = None
+    enough_floor = False
+    for _ in range(attempts):
+        grid = _random_room(rows, cols, walls, rng)
+        floor = [(r, c) for r in range(rows) for c in range(cols) if grid[r][c] != '#']
+        if len(floor) < boxes + 1:
+            continue
+        enough_floor = True
+        cells = rng.sample(floor, boxes + 1)
+        level, pushes = _reverse_pulls(grid, cells[:boxes], cells[boxes], pulls, rng)
+        if not pushes:
+            continue
+        solver = SokobanSolver(level, push_level=True)
+        solution = solver.solve(max_expanded=verify_max_expanded)
+        optimal = solution is not None
+        if solution is None:
+            solution = SokobanSolver(level, push_level=True)._expand_pushes(pushes)
+        moves = ''.join(solution)
+        record = {
+            'map': level, 'solution': moves, 'pushes': sum(1 for m in moves if m.isupper()),
+            'box_lines': count_box_lines(moves), 'optimal': optimal, 'seed': seed,
+        }
+        record['target_met'] = record['pushes'] >= min_pushes and record['box_lines'] >= min_box_lines
+        if best is None or (record['pushes'], record['box_lines']) > (best['pushes'], best['box_lines']):
+            best = record
+        if record['target_met']:
+            return record
+    if not enough_floor:
+        raise ValueError("可用地板格太少，无法生成关卡，请减少墙或箱子数量")
+    if best is None:
+        raise ValueError(f"{attempts} 次尝试中随机拉箱子都没能拉动任何箱子，请增加尝试次数或减少墙与箱子数量")
+    return best
+
+
+def _generate_one(args: Tuple[int, dict]) -> dict:
+    seed, options = args
+    return generate_level(seed=seed, **options)
+
+
+def generate_batch(count: int, workers: Optional[int] = None, seed: Optional[int] = None, **options) -> List[dict]:
+    """在进程池中并行生成 count 个关卡；第 i 个关卡使用种子 seed + i，给定 seed 时结果可复现。"""
+    base = random.randrange(1 << 31) if seed is None else seed
+    tasks = [(base + i, options) for i in range(count)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_generate_one, tasks))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sokoban 可解关卡生成器（反向拉箱子）")
+    parser.add_argument('--rows', type=int, default=9)
+    parser.add_argument('--cols', type=int, default=9)
+    parser.add_argument('--boxes', type=int, default=2)
+    parser.add_argument('--walls', type=int, default=8, help='内部随机墙块数量')
+    parser.add_argument('--min-pushes', type=int, default=0, help='最优解至少需要的推箱次数')
+    parser.add_argument('--min-box-lines', type=int, default=0, help='最优解至少包含的箱子线数')
+    parser.add_argument('--attempts', type=int, default=20, help='每个关卡最多尝试次数')
+    parser.add_argument('--count', type=int, default=1, help='生成关卡数量')
+    parser.add_argument('--workers', type=int, default=None, help='工作进程数（默认为 CPU 核数）')
+    parser.add_argument('--seed', type=int, default=None, help='随机种子，给定时结果可复现')
+    parser.add_argument('--out-dir', default=None, help='把关卡写成 .txt 文件保存到该目录')
+    args = parser.parse_args()
+
+    records = generate_batch(args.count, workers=args.workers, seed=args.seed, rows=args.rows, cols=args.cols,
+                             boxes=args.boxes, walls=args.walls, min_pushes=args.min_pushes,
+                             min_box_lines=args.min_box_lines, attempts=args.attempts)
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    for record in records:
+        if args.out_dir:
+            path = os.path.join(args.out_dir, f"gen-{record['seed']}.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(record['map']) + '\n')
+            record['level'] = path
+        sys.stdout.write(json.dumps(record, ensure_ascii=False) + '\n')
@@ -0,0 +1,213 @@
+from collections import deque
+
+# 箱子无法被推到某目标点时使用的代价，足够大以至于任何可行匹配都不会选中它
+UNREACHABLE = 10 ** 9
+
+
+def _hungarian_phase(cost, i, u, v, p, m):
+    """
+    匈牙利算法的一轮增广：把第 i 行（从 1 开始）加入当前匹配。
+
+    要求 u、v 满足 u[r] + v[j] <= cost[r-1][j-1]，且已匹配的边是紧的；
+    增广后对偶可行性与互补松弛仍然成立，因此可以在已有匹配上增量调用。
+    """
+    way = [0] * (m + 1)
+    minv = [float('inf')] * (m + 1)
+    used = [False] * (m + 1)
+    p[0] = i
+    j0 = 0
+    while True:
+        used[j0] = True
+        i0 = p[j0]
+        row = cost[i0 - 1]
+        ui0 = u[i0]
+        delta = float('inf')
+        j1 = 0
+        for j in range(1, m + 1):
+            if not used[j]:
+                cur = row[j - 1] - ui0 - v[j]
+                if cur < minv[j]:
+                    minv[j] = cur
+                    way[j] = j0
+                if minv[j] < delta:
+                    delta = minv[j]
+                    j1 = j
+        for j in range(m + 1):
+            if used[j]:
+                u[p[j]] += delta
+                v[j] -= delta
+            else:
+                minv[j] -= delta
+        j0 = j1
+        if p[j0] == 0:
+            break
+    while True:
+        j1 = way[j0]
+        p[j0] = p[j1]
+        j0 = j1
+        if j0 == 0:
+            break
+
+
+def min_cost_assignment(cost):
+    """
+    匈牙利算法求最小代价完全匹配（行数 n <= 列数 m）。
+
+    cost[i][j] 为第 i 行（箱子）匹配第 j 列（目标点）的代价。
+    返回 (总代价, assignment)，assignment[i] 为第 i 行匹配到的列下标。
+    """
+    n = len(cost)
+    if n == 0:
+        return 0, []
+    m = len(cost[0])
+    # 下标从 1 开始，第 0 列作为虚拟起点
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    p = [0] * (m + 1)
+    for i in range(1, n + 1):
+        _hungarian_phase(cost, i, u, v, p, m)
+    assignment = [0] * n
+    total = 0
+    for j in range(1, m + 1):
+        if p[j]:
+            assignment[p[j] - 1] = j - 1
+            total += cost[p[j] - 1][j - 1]
+    return total, assignment
+
+
+class SokobanHeuristic:
+    """
+    基于推箱距离的最小代价匹配启发函数。
+
+    构造时对每个目标点做一次反向拉箱 BFS，得到 distances[t][idx]：
+    忽略其他箱子时，把 idx 上的箱子推到第 t 个目标点所需的最少推箱次数。
+    估值时在箱子与目标点之间求最优二分匹配，其总代价是剩余推箱数的下界，
+    而每次推箱至少消耗一步，因此对逐步搜索与推箱级搜索都是可接受的。
+
+    搜索中每个节点携带一份匹配信息 info = (h, cells, u, v, p)：
+    cells 为各行对应的箱子格子编号（目标点多于箱子时用 -1 补足为方阵），
+    u、v 为对偶势，p[j] 为第 j 列匹配到的行。推动一个箱子只改变一行代价，
+    update() 在父节点的匹配上只做一轮增广，代价从 O(n^3) 降为 O(n^2)。
+    """
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.target_cells = sorted(solver._index(pos) for pos in solver.targets)
+        self.distances = [self._pull_distances(t) for t in self.target_cells]
+        self._row_cache = {}
+
+    def _pull_distances(self, target):
+        # 箱子从 q 被拉到 p = q - d，需要 p 与玩家站位 p - d 均可走
+        step, opposite = self.solver.step, self.solver.OPPOSITE
+        dist = [UNREACHABLE] * self.solver.size
+        dist[target] = 0
+        queue = deque([target])
+        while queue:
+            q = queue.popleft()
+            for d in range(len(step)):
+                p = step[opposite[d]][q]
+                if p < 0 or dist[p] != UNREACHABLE or step[opposite[d]][p] < 0:
+                    continue
+                dist[p] = dist[q] + 1
+                queue.append(p)
+        return dist
+
+    def _row(self, cell):
+        # 补位行（-1）到所有目标点的代价均为 0，不影响总代价
+        row = self._row_cache.get(cell)
+        if row is None:
+            row = [0] * len(self.distances) if cell < 0 else [dist[cell] for dist in self.distances]
+            self._row_cache[cell] = row
+        return row
+
+    def _finish(self, cells, cost, u, v, p):
+        total = 0
+        for j in range(1, len(p)):
+            total += cost[p[j] - 1][j - 1]
+        if total >= UNREACHABLE:
+            return None
+        return (total, tuple(cells), tuple(u), tuple(v), tuple(p))
+
+    def initial(self, boxes):
+        """从零计算箱子位掩码的匹配信息；箱子无法全部匹配到目标点时返回 None（死锁）。"""
+        box_cells = list(self.solver._iter_boxes(boxes))
+        m = len(self.target_cells)
+        if len(box_cells) > m:
+            return None
+        cells = box_cells + [-1] * (m - len(box_cells))
+        cost = [self._row(cell) for cell in cells]
+        u = [0] * (m + 1)
+        v = [0] * (m + 1)
+        p = [0] * (m + 1)
+        for i in range(1, m + 1):
+            _hungarian_phase(cost, i, u, v, p, m)
+        return self._finish(cells, cost, u, v, p)
+
+    def update(self, info, old_cell, new_cell):
+        """
+        在父节点匹配信息上增量更新：箱子从 old_cell 移到 new_cell。
+
+        把该行移出匹配，重新设置其势 u 使对偶保持可行，再做一轮增广即可得到新的最优匹配。
+        """
+        _, cells, u, v, p = info
+        cells, u, v, p = list(cells), list(u), list(v), list(p)
+        row = cells.index(old_cell)
+        cells[row] = new_cell
+        i = row + 1
+        m = len(cells)
+        cost = [self._row(cell) for cell in cells]
+        for j in range(1, m + 1):
+            if p[j] == i:
+                p[j] = 0
+        new_row = cost[row]
+        u[i] = min(new_row[j - 1] - v[j] for j in range(1, m + 1))
+        _hungarian_phase(cost, i, u, v, p, m)
+        return self._finish(cells, cost, u, v, p)
+
+    def estimate(self, boxes):
+        """返回箱子位掩码对应的启发值；箱子无法全部匹配到目标点时返回 None（死锁）。"""
+        info = self.initial(boxes)
+        return None if info is None else info[0]
+
+
+class ReverseHeuristic:
+    """
+    双向搜索中反向（拉箱）搜索的启发函数。
+
+    构造时从初始局面的每个箱子出发做一次正向推箱 BFS，得到 distances[s][idx]：
+    忽略其他箱子时，把第 s 个初始箱子推到 idx 所需的最少推箱次数，也就是把 idx 上的箱子
+    拉回该初始位置的最少拉箱次数。估值时在当前箱子与初始位置之间求最优匹配，
+    其总代价是剩余拉箱数的下界。
+    """
+
+    def __init__(self, solver, start_boxes):
+        self.solver = solver
+        self.distances = [self._push_distances(cell) for cell in solver._iter_boxes(start_boxes)]
+        self._row_cache = {}
+
+    def _push_distances(self, source):
+        # 箱子从 q 被推到 q + d，需要 q + d 与玩家站位 q - d 均可走
+        step, opposite = self.solver.step, self.solver.OPPOSITE
+        dist = [UNREACHABLE] * self.solver.size
+        dist[source] = 0
+        queue = deque([source])
+        while queue:
+            q = queue.popleft()
+            for d in range(len(step)):
+                nxt = step[d][q]
+                if nxt < 0 or dist[nxt] != UNREACHABLE or step[opposite[d]][q] < 0:
+                    continue
+                dist[nxt] = dist[q] + 1
+                queue.append(nxt)
+        return dist
+
+    def estimate(self, boxes):
+        """返回箱子位掩码拉回初始局面所需拉箱数的下界；无法匹配时返回 None。"""
+        cost = []
+        for cell in self.solver._iter_boxes(boxes):
+            row = self._row_cache.get(cell)
+            if row is None:
+                row = self._row_cache[cell] = [dist[cell] for dist in self.distances]
+            cost.append(row)
+        total, _ = min_cost_assignment(cost)
+        return None if total >= UNREACHABLE else total
@@ -0,0 +1,48 @@
+class BucketOpenList:
+    """
+    A* 的开放列表：按整数 f 值分桶，桶内再按 g 分栈。
+
+    - 弹出最小 f；f 相同时优先弹出 g 最大（离目标更近）的条目，同 g 内后进先出。
+    - 条目本身从不参与比较，因此可以放任意对象（状态、父节点、匹配信息等）。
+    - 不支持删除：同一状态被更优的 g 重新加入时，旧条目仍留在桶中，
+      由调用方在弹出时与 visited 中记录的最优 g 比较后丢弃（惰性删除）。
+    """
+
+    def __init__(self):
+        self._buckets = []  # _buckets[f][g] -> 条目栈
+        self._tops = []     # _tops[f]：该 f 桶中可能非空的最大 g，-1 表示空桶
+        self._min_f = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def push(self, f, g, entry):
+        while len(self._buckets) <= f:
+            self._buckets.append([])
+            self._tops.append(-1)
+        bucket = self._buckets[f]
+        while len(bucket) <= g:
+            bucket.append([])
+        bucket[g].append(entry)
+        if g > self._tops[f]:
+            self._tops[f] = g
+        if f < self._min_f:
+            self._min_f = f
+        self._size += 1
+
+    def pop(self):
+        """弹出并返回 (f, g, entry)；列表为空时抛出 IndexError。"""
+        if not self._size:
+            raise IndexError("pop from empty open list")
+        while True:
+            f = self._min_f
+            bucket = self._buckets[f]
+            g = self._tops[f]
+            while g >= 0 and not bucket[g]:
+                g -= 1
+            self._tops[f] = g
+            if g >= 0:
+                self._size -= 1
+                return f, g, bucket[g].pop()
+            self._min_f += 1
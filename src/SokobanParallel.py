@@ -0,0 +1,284 @@
+import os
+import time
+import queue
+import multiprocessing
+from typing import Callable, List, Optional, Tuple
+
+from SokobanSolver import SokobanSolver
+from SokobanOpenList import BucketOpenList
+
+# 发往同一个工作进程的状态攒够这么多条才打包发送一次
+BATCH_SIZE = 64
+# 每处理完一次收件箱最多连续扩展的节点数（之后发送缓冲区中的状态并再次查看收件箱）
+EXPAND_CHUNK = 64
+# 协调者两轮终止探测之间的最短间隔（秒）
+PROBE_INTERVAL = 0.02
+# 工作进程最后汇总的计数类统计量
+_COUNTERS = ('expanded', 'generated', 'duplicates', 'stale', 'pruned_dead_square', 'pruned_freeze',
+             'pruned_matching', 'pruned_bound', 'pruned_corral_deadlock', 'pruned_pattern', 'patterns_learned',
+             'pi_corrals', 'macro_moves')
+
+
+def _owner(state, workers: int) -> int:
+    # 按 Zobrist 哈希把状态划分给工作进程，同一状态总由同一个进程负责去重
+    return state[2] % workers
+
+
+def _worker(index: int, board_map: List[str], solver_options: dict, weight: float, inboxes, results) -> None:
+    """
+    HDA* 工作进程：拥有哈希落在自己名下的状态的开放列表、g 表与父指针。
+
+    收件箱消息：('states', 条目列表) 其他进程生成的状态；('bound', 代价) 当前最优解代价；
+    ('probe', 轮次) 终止探测；('trace', key) 查询父指针；('stop',) 退出。
+    条目为 (key, state, 父 key, 父所属进程, move, g, 匹配信息)。
+    """
+    workers = len(inboxes)
+    inbox = inboxes[index]
+    solver = SokobanSolver(board_map, **solver_options)
+    stats = solver.stats
+    start_state, get_next_states = solver._search_start()
+    open_list = BucketOpenList()
+    visited = {}
+    parents = {}  # key -> (父 key, 父所属进程, move)
+    outgoing = [[] for _ in range(workers)]
+    # sent / received 为发出与收到的 'states' 消息数，供协调者判断是否还有消息在途
+    sent = received = 0
+    bound = None
+
+    def accept(entry):
+        key, state, parent_key, parent_owner, move, g_score, h_info = entry
+        if key in visited and g_score >= visited[key]:
+            stats['duplicates'] += 1
+            return
+        visited[key] = g_score
+        if parent_key is not None:
+            parents[key] = (parent_key, parent_owner, move)
+        if bound is not None and g_score + h_info[0] >= bound:
+            stats['pruned_bound'] += 1
+            return
+        open_list.push(g_score + int(h_info[0] * weight), g_score, entry)
+
+    def flush(target):
+        nonlocal sent
+        inboxes[target].put(('states', outgoing[target]))
+        outgoing[target] = []
+        sent += 1
+
+    try:
+        if _owner(start_state, workers) == index:
+            start_info = solver.heuristic.initial(start_state[1])
+            accept((solver._key(start_state), start_state, None, None, None, 0, start_info))
+        while True:
+            # 有可扩展的节点时只取走已到达的消息，否则先发出缓冲区再阻塞等待
+            while True:
+                if not open_list:
+                    for target in range(workers):
+                        if outgoing[target]:
+                            flush(target)
+                try:
+                    message = inbox.get(block=not open_list)
+                except queue.Empty:
+                    break
+                kind = message[0]
+                if kind == 'states':
+                    received += 1
+                    for entry in message[1]:
+                        accept(entry)
+                elif kind == 'bound':
+                    bound = message[1] if bound is None else min(bound, message[1])
+                elif kind == 'probe':
+                    idle = not open_list and not any(outgoing)
+                    results.put(('status', index, message[1], idle, sent, received,
+                                 {name: stats[name] for name in _COUNTERS}, len(visited), len(open_list)))
+                elif kind == 'trace':
+                    results.put(('trace', parents.get(message[1])))
+                elif kind == 'stop':
+                    results.put(('stats', index, {name: stats[name] for name in _COUNTERS}))
+                    return
+            for _ in range(EXPAND_CHUNK):
+                if not open_list:
+                    break
+                _, g_score, (key, state, _, _, _, _, h_info) = open_list.pop()
+                if g_score > visited[key]:
+                    stats['stale'] += 1
+                    continue
+                if bound is not None and g_score + h_info[0] >= bound:
+                    stats['pruned_bound'] += 1
+                    continue
+                if solver._is_goal(state):
+                    # 目标状态不再扩展；只有比已知解更短时才上报
+                    bound = g_score
+                    results.put(('solution', g_score, key, index))
+                    continue
+                stats['expanded'] += 1
+                for next_state, next_move in get_next_states(state):
+                    next_info = solver._next_heuristic(h_info, state[1], next_state[1])
+                    if next_info is None:
+                        stats['pruned_matching'] += 1
+                        continue
+                    new_g_score = g_score + (len(next_move) if next_move.__class__ is list else 1)
+                    entry = (solver._key(next_state), next_state, key, index, next_move, new_g_score, next_info)
+                    stats['generated'] += 1
+                    target = _owner(next_state, workers)
+                    if target == index:
+                        accept(entry)
+                    else:
+                        outgoing[target].append(entry)
+                        if len(outgoing[target]) >= BATCH_SIZE:
+                            flush(target)
+            for target in range(workers):
+                if outgoing[target]:
+                    flush(target)
+    finally:
+        # 预算耗尽时发给其他进程的状态可能不再被取走，不等待后台线程把它们写完；
+        # results 中的统计量仍需送达主进程
+        for box in inboxes:
+            box.cancel_join_thread()
+
+
+def _receive(results, processes, timeout: float = PROBE_INTERVAL):
+    """
+    从结果队列取一条消息，超时返回 None。搜索结束前工作进程不会自行退出，
+    因此超时时发现有进程已退出即视为异常：终止其余进程并抛出 RuntimeError，避免一直等待。
+    """
+    try:
+        return results.get(timeout=timeout)
+    except queue.Empty:
+        dead = [process.exitcode for process in processes if not process.is_alive()]
+        if dead:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            raise RuntimeError(f"并行搜索的工作进程异常退出（退出码 {dead[0]}）")
+        return None
+
+
+def solve_parallel(board_map: List[str], workers: Optional[int] = None, weight: float = 1,
+                   time_limit: Optional[float] = None, max_expanded: Optional[int] = None,
+                   progress: Optional[Callable[[dict], None]] = None,
+                   **solver_options) -> Tuple[Optional[list], dict]:
+    """
+    HDA* 风格的并行 A*：按 Zobrist 哈希把状态划分给 workers 个工作进程，返回 (路径, 统计量)。
+
+    每个进程拥有自己的开放列表与 g 表，生成的后继按哈希发往其所属进程（批量打包，经队列传递）。
+    找到目标的进程把代价上报给主进程，主进程再广播给所有进程，用于剪掉 g + h 不小于它的节点。
+    主进程周期性地探测各进程：连续两轮所有进程都空闲、各自的收发消息计数完全相同且
+    全体发出数等于收到数时，说明没有消息在途，已知最优解即为最终结果（weight=1 时为最优解）。
+    之后沿分布在各进程中的父指针逐个查询回溯路径。
+
+    solver_options 作为 SokobanSolver 构造参数（如 push_level、macros）。
+    time_limit 与 max_expanded 为搜索预算，耗尽时返回 (None, stats) 且 stats['budget_exhausted'] 为 True；
+    progress 为可选回调，每轮探测以汇总后的统计量调用一次。
+    """
+    workers = workers or os.cpu_count() or 1
+    start_time = time.perf_counter()
+    deadline = start_time + time_limit if time_limit is not None else None
+    solver = SokobanSolver(board_map, **solver_options)
+    stats = dict(solver.stats, workers=workers, messages=0)
+    start_state, _ = solver._search_start()
+    if solver.heuristic.initial(start_state[1]) is None:
+        return None, stats
+    if solver._is_goal(start_state):
+        return [], stats
+
+    inboxes = [multiprocessing.Queue() for _ in range(workers)]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_worker, args=(i, board_map, solver_options, weight, inboxes, results),
+                                         daemon=True) for i in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        best = None  # (代价, 目标 key, 所属进程)
+        wave = 0
+        probing = False
+        replies = {}
+        previous = None
+        next_probe = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                stats['budget_exhausted'] = True
+                break
+            if not probing and now >= next_probe:
+                wave += 1
+                probing = True
+                for box in inboxes:
+                    box.put(('probe', wave))
+            message = _receive(results, processes)
+            if message is None:
+                continue
+            if message[0] == 'solution':
+                _, cost, key, owner = message
+                if best is None or cost < best[0]:
+                    best = (cost, key, owner)
+                    for box in inboxes:
+                        box.put(('bound', cost))
+            elif message[0] == 'status' and message[2] == wave:
+                replies[message[1]] = message[3:]
+                if len(replies) < workers:
+                    continue
+                for name in _COUNTERS:
+                    stats[name] = sum(reply[3][name] for reply in replies.values())
+                stats['visited'] = sum(reply[4] for reply in replies.values())
+                stats['open_size'] = sum(reply[5] for reply in replies.values())
+                stats['open_peak'] = max(stats['open_peak'], stats['open_size'])
+                stats['messages'] = sum(reply[1] for reply in replies.values())
+                stats['time_total'] = time.perf_counter() - start_time
+                if progress is not None:
+                    progress(dict(stats))
+                # 每个进程的 (是否空闲, 发出数, 收到数)
+                snapshot = tuple(replies[i][:3] for i in range(workers))
+                replies = {}
+                probing = False
+                next_probe = time.perf_counter() + PROBE_INTERVAL
+                if (snapshot == previous and all(idle for idle, _, _ in snapshot)
+                        and sum(sent for _, sent, _ in snapshot) == sum(received for _, _, received in snapshot)):
+                    break
+                previous = snapshot
+                if max_expanded is not None and stats['expanded'] >= max_expanded:
+                    stats['budget_exhausted'] = True
+                    break
+
+        path = None
+        if best is not None and not stats['budget_exhausted']:
+            # 沿父指针回溯：每个父指针保存在其状态所属的进程中
+            moves = []
+            key, owner = best[1], best[2]
+            while True:
+                inboxes[owner].put(('trace', key))
+                link = _receive(results, processes)
+                while link is None or link[0] != 'trace':
+                    link = _receive(results, processes)
+                if link[1] is None:
+                    break
+                key, owner, move = link[1]
+                moves.append(move)
+            moves.reverse()
+            path = solver._finish_path(moves)
+        for box in inboxes:
+            box.put(('stop',))
+        # 用各进程退出前的最终计数覆盖探测时的汇总
+        totals = dict.fromkeys(_COUNTERS, 0)
+        finished = 0
+        stop_deadline = time.perf_counter() + 1
+        while finished < workers and time.perf_counter() < stop_deadline:
+            try:
+                message = results.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if message[0] == 'stats':
+                finished += 1
+                for name in _COUNTERS:
+                    totals[name] += message[2][name]
+        if finished == workers:
+            stats.update(totals)
+        stats['time_total'] = time.perf_counter() - start_time
+        return path, stats
+    finally:
+        for process in processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        for box in inboxes + [results]:
+            box.cancel_join_thread()
+            box.close()
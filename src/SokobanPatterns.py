@@ -0,0 +1,303 @@
+import os
+import sys
+import time
+import sqlite3
+from collections import deque
+from typing import List, Optional, Tuple
+
+# 默认模式库文件：与求解缓存一样放在用户主目录下，可用环境变量 SOKOBAN_PATTERNS 覆盖
+DEFAULT_PATTERN_PATH = os.environ.get('SOKOBAN_PATTERNS') or os.path.join(os.path.expanduser('~'), '.sokoban_patterns.sqlite3')
+# 模式窗口以锚点箱子为中心，边长 2 * RADIUS + 1
+RADIUS = 2
+SIDE = 2 * RADIUS + 1
+# 窗口内局部证明最多访问的状态数，超过仍未定论时不记录
+LOCAL_SEARCH_LIMIT = 5000
+# 只记录窗口内箱子数不超过该值的模式
+MAX_PATTERN_BOXES = 6
+
+_CELLS = SIDE * SIDE
+_CENTER = RADIUS * SIDE + RADIUS
+_BORDER = [i for i in range(_CELLS) if i // SIDE in (0, SIDE - 1) or i % SIDE in (0, SIDE - 1)]
+# _STEPS[d][i]：窗口内第 i 格朝方向 d（上下左右）走一步的格子，走出窗口为 -1
+_STEPS = tuple(tuple((i // SIDE + dr) * SIDE + i % SIDE + dc
+                     if 0 <= i // SIDE + dr < SIDE and 0 <= i % SIDE + dc < SIDE else -1 for i in range(_CELLS))
+               for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)))
+_OPPOSITE = (1, 0, 3, 2)
+
+
+def _symmetries() -> List[Tuple[int, ...]]:
+    # 窗口的 8 种旋转/镜像，perm[i] 为变换后第 i 格在原窗口中的位置
+    perms = []
+    for transpose in (False, True):
+        for flip_rows in (False, True):
+            for flip_cols in (False, True):
+                perm = []
+                for i in range(_CELLS):
+                    r, c = divmod(i, SIDE)
+                    if flip_cols:
+                        c = SIDE - 1 - c
+                    if flip_rows:
+                        r = SIDE - 1 - r
+                    if transpose:
+                        r, c = c, r
+                    perm.append(r * SIDE + c)
+                perms.append(tuple(perm))
+    return perms
+
+
+_SYMMETRIES = _symmetries()
+
+
+def _flood(static: str, boxes: int, starts, outside: bool) -> int:
+    """
+    窗口内的玩家可达区域（位掩码）。窗口外视为一个与所有边界空地相连的整体：
+    outside 为 True 表示玩家能到达窗口外，此时所有边界上的空地都可达。
+    """
+    seen = 0
+    queue = deque()
+    for i in list(starts) + (_BORDER if outside else []):
+        if static[i] != '#' and not boxes >> i & 1 and not seen >> i & 1:
+            seen |= 1 << i
+            queue.append(i)
+    while queue:
+        cur = queue.popleft()
+        for table in _STEPS:
+            nxt = table[cur]
+            if nxt >= 0 and static[nxt] != '#' and not boxes >> nxt & 1 and not seen >> nxt & 1:
+                seen |= 1 << nxt
+                queue.append(nxt)
+    return seen
+
+
+def _target_mask(static: str) -> int:
+    return sum(1 << i for i, ch in enumerate(static) if ch == '.')
+
+
+def _reaches_outside(static: str, region: int) -> bool:
+    return any(region >> i & 1 for i in _BORDER)
+
+
+def prove_local_deadlock(static: str, boxes: int, region: int) -> bool:
+    """
+    只用窗口内的信息证明死锁：窗口外视为可自由行走、没有其他箱子的空地。
+    把窗口内的箱子全部推上窗口内的目标点，或把任意一个箱子推出窗口，都算作“可能有解”；
+    搜索穷尽仍做不到时，无论窗口外是什么布局，这些箱子都不可能全部归位。
+    去掉窗口内外的其他箱子只会让问题更容易，因此结论对包含这些箱子的任何局面都成立。
+    箱子一开始就全部在目标点上时不是死锁（即使它们都推不动）。
+    """
+    targets = _target_mask(static)
+    if not boxes & ~targets:
+        return False
+    start = (boxes, region)
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        if len(seen) > LOCAL_SEARCH_LIMIT:
+            return False
+        boxes, region = queue.popleft()
+        outside = _reaches_outside(static, region)
+        remaining = boxes
+        while remaining:
+            low = remaining & -remaining
+            box = low.bit_length() - 1
+            remaining ^= low
+            for d, table in enumerate(_STEPS):
+                side = _STEPS[_OPPOSITE[d]][box]
+                if side < 0:
+                    if not outside:
+                        continue
+                elif not region >> side & 1:
+                    continue
+                dest = table[box]
+                if dest < 0:
+                    return False
+                if static[dest] == '#' or boxes >> dest & 1:
+                    continue
+                new_boxes = boxes ^ low ^ (1 << dest)
+                if not new_boxes & ~targets:
+                    return False
+                new_region = _flood(static, new_boxes, [box], False)
+                if _reaches_outside(static, new_region):
+                    new_region = _flood(static, new_boxes, [box], True)
+                state = (new_boxes, new_region)
+                if state not in seen:
+                    seen.add(state)
+                    queue.append(state)
+    return True
+
+
+def _encode(static: str, boxes: int, region: int) -> str:
+    # 窗口文本：# 墙，空格/. 地板/目标点，$/* 箱子（在目标点上），-/+ 玩家可达的地板/目标点
+    chars = []
+    for i, ch in enumerate(static):
+        if boxes >> i & 1:
+            ch = '*' if ch == '.' else '$'
+        elif region >> i & 1:
+            ch = '+' if ch == '.' else '-'
+        chars.append(ch)
+    return ''.join(chars)
+
+
+def _decode(text: str) -> Tuple[str, int, int]:
+    static = ''.join('.' if ch in '.*+' else '#' if ch == '#' else ' ' for ch in text)
+    boxes = sum(1 << i for i, ch in enumerate(text) if ch in '$*')
+    region = sum(1 << i for i, ch in enumerate(text) if ch in '-+')
+    return static, boxes, region
+
+
+def _permute(text: str, perm) -> str:
+    return ''.join(text[j] for j in perm)
+
+
+def canonical_pattern(text: str) -> str:
+    """8 种旋转/镜像中字典序最小的窗口文本，同一模式的各种朝向只存一条。"""
+    return min(_permute(text, perm) for perm in _SYMMETRIES)
+
+
+class PatternStore:
+    """
+    跨求解持久化的死锁模式库（sqlite），加载后以窗口的静态布局为键建立内存索引。
+
+    模式是以某个箱子为中心的 5x5 窗口：墙/地板/目标点的静态布局、窗口内的箱子，以及
+    窗口内玩家可达的格子。只有能在窗口内单独证明为死锁（prove_local_deadlock）的模式
+    才会被记录，因此与关卡其余部分无关，可在任何关卡中复用。查询时只要实际局面包含
+    模式中的全部箱子、且玩家可达区域不超出模式中的可达区域，即判为死锁。
+
+    verify() 可对库中每条模式重新做一次局部证明，删除不再成立的模式。
+    数据库不可用、被锁或损坏时读写失败一律忽略，只使用内存中的模式，不影响求解。
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_PATTERN_PATH):
+        self.path = path
+        # 静态布局 -> [(箱子掩码, 可达掩码)]，每条模式按 8 种朝向各登记一次
+        self.index = {}
+        self.known = set()
+        self._conn = None
+        if path is None:
+            return
+        try:
+            self._conn = sqlite3.connect(path, timeout=30)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS patterns (pattern TEXT PRIMARY KEY, boxes INTEGER NOT NULL, created REAL NOT NULL)")
+            self._conn.commit()
+            for (text,) in self._conn.execute("SELECT pattern FROM patterns"):
+                self._index(text)
+        except sqlite3.Error:
+            self.close()
+
+    def __len__(self):
+        return len(self.known)
+
+    def _index(self, text: str) -> None:
+        if len(text) != _CELLS or text in self.known:
+            return
+        self.known.add(text)
+        variants = {_permute(text, perm) for perm in _SYMMETRIES}
+        for variant in variants:
+            static, boxes, region = _decode(variant)
+            self.index.setdefault(static, []).append((boxes, region))
+
+    def windows(self, solver) -> List[Tuple[str, Tuple[int, ...]]]:
+        """为求解器的每个格子预先计算以它为中心的窗口：(静态布局, 窗口各格对应的格子编号，越界为 -1)。"""
+        result = []
+        for idx in range(solver.size):
+            r, c = solver._position(idx)
+            cells, chars = [], []
+            for i in range(_CELLS):
+                wr, wc = r + i // SIDE - RADIUS, c + i % SIDE - RADIUS
+                if solver._is_wall(wr, wc):
+                    cells.append(-1)
+                    chars.append('#')
+                else:
+                    cell = wr * solver.cols + wc
+                    cells.append(cell)
+                    chars.append('.' if solver.target_mask >> cell & 1 else ' ')
+            result.append((''.join(chars), tuple(cells)))
+        return result
+
+    @staticmethod
+    def _window_boxes(cells, boxes: int) -> int:
+        return sum(1 << i for i, cell in enumerate(cells) if cell >= 0 and boxes >> cell & 1)
+
+    def matches(self, window, boxes: int, player: int) -> bool:
+        """
+        箱子刚被推到窗口中心、玩家站在 player 时，局面是否包含已知的死锁模式。
+        玩家可达区域按“能到达窗口外”从宽估计，只会少判不会误判。
+        """
+        static, cells = window
+        entries = self.index.get(static)
+        if not entries:
+            return False
+        box_mask = self._window_boxes(cells, boxes)
+        region = None
+        for pattern_boxes, pattern_region in entries:
+            if pattern_boxes & box_mask != pattern_boxes:
+                continue
+            if region is None:
+                region = _flood(static, box_mask, [cells.index(player)] if player in cells else [], True)
+            if not region & ~pattern_region:
+                return True
+        return False
+
+    def learn(self, window, boxes: int, reachable) -> bool:
+        """
+        尝试从一个已知死锁的局面中提取以窗口中心箱子为锚点的模式：boxes 为参与死锁的箱子，
+        reachable 为玩家可达的格子集合。局部证明成立时写入模式库并返回 True。
+        """
+        static, cells = window
+        box_mask = self._window_boxes(cells, boxes)
+        # 窗口内的箱子都已在目标点上时，死锁出在窗口之外，不能作为局部模式
+        if bin(box_mask).count('1') > MAX_PATTERN_BOXES or not box_mask & ~_target_mask(static):
+            return False
+        inside = [i for i, cell in enumerate(cells) if cell in reachable]
+        region = _flood(static, box_mask, inside, len(inside) < len(reachable))
+        if not prove_local_deadlock(static, box_mask, region):
+            return False
+        text = canonical_pattern(_encode(static, box_mask, region))
+        if text in self.known:
+            return False
+        self._index(text)
+        if self._conn is not None:
+            try:
+                self._conn.execute("INSERT OR IGNORE INTO patterns VALUES (?, ?, ?)",
+                                   (text, bin(box_mask).count('1'), time.time()))
+                self._conn.commit()
+            except sqlite3.Error:
+                pass
+        return True
+
+    def verify(self) -> int:
+        """对库中每条模式重新做局部证明，删除不成立的模式并重建内存索引，返回删除的条数。"""
+        if self._conn is None:
+            return 0
+        removed = []
+        for text in sorted(self.known):
+            if not prove_local_deadlock(*_decode(text)):
+                removed.append((text,))
+        if removed:
+            try:
+                self._conn.executemany("DELETE FROM patterns WHERE pattern = ?", removed)
+                self._conn.commit()
+            except sqlite3.Error:
+                return 0
+            bad = {text for (text,) in removed}
+            kept = self.known - bad
+            self.index = {}
+            self.known = set()
+            for text in kept:
+                self._index(text)
+        return len(removed)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+if __name__ == "__main__":
+    # 校验模式库：python SokobanPatterns.py [模式库文件]
+    store = PatternStore(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATTERN_PATH)
+    total = len(store)
+    removed = store.verify()
+    store.close()
+    print(f"{total} 条模式，删除 {removed} 条不成立的模式")
@@ -0,0 +1,133 @@
+from typing import List, Optional, Set, Tuple
+
+from SokobanSolver import SokobanSolver
+
+Cell = Tuple[int, int]
+
+_DIRECTIONS = {'U': (-1, 0), 'D': (1, 0), 'L': (0, -1), 'R': (0, 1)}
+
+
+class Playback:
+    """
+    解的回放引擎：直接跟踪玩家与箱子位置，前进、后退都只修改两三个格子。
+
+    构造时沿解模拟一遍，为每一步记录增量 (玩家原位置, 玩家新位置, 箱子原位置, 箱子新位置)
+    （不推箱时箱子两项为 None），前进/后退据此 O(1) 完成；每隔 keyframe_interval 步保存一个
+    关键帧（玩家位置 + 箱子集合），seek() 从最近的关键帧出发，最多再走 keyframe_interval 步。
+    grid 为当前局面的字符地图（list of lists），可直接交给视图绘制；
+    各操作返回内容发生变化的格子，供增量重绘使用。
+    """
+
+    KEYFRAME_INTERVAL = 64
+
+    def __init__(self, board_map: List[str], moves: List[str], keyframe_interval: Optional[int] = None) -> None:
+        s = SokobanSolver
+        self.grid = [list(row) for row in board_map]
+        self.moves = list(moves)
+        self.keyframe_interval = keyframe_interval or self.KEYFRAME_INTERVAL
+        self.index = 0
+        self.targets: Set[Cell] = set()
+        self.boxes: Set[Cell] = set()
+        self.player: Optional[Cell] = None
+        for r, row in enumerate(self.grid):
+            for c, ch in enumerate(row):
+                if ch in (s.TARGET, s.BOX_ON_TARGET, s.PLAYER_ON_TARGET):
+                    self.targets.add((r, c))
+                if ch in (s.BOX, s.BOX_ON_TARGET):
+                    self.boxes.add((r, c))
+                if ch in (s.PLAYER, s.PLAYER_ON_TARGET):
+                    self.player = (r, c)
+        if self.player is None:
+            raise ValueError("地图中没有玩家")
+        self.deltas: List[Tuple[Cell, Cell, Optional[Cell], Optional[Cell]]] = []
+        self.keyframes: List[Tuple[Cell, frozenset]] = []
+        self._record()
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def _record(self) -> None:
+        # 只在位置上模拟一遍，生成每一步的增量与关键帧，不触碰 grid
+        player, boxes = self.player, set(self.boxes)
+        for i, move in enumerate(self.moves):
+            if i % self.keyframe_interval == 0:
+                self.keyframes.append((player, frozenset(boxes)))
+            dr, dc = _DIRECTIONS[move.upper()]
+            nxt = (player[0] + dr, player[1] + dc)
+            if nxt in boxes:
+                to = (nxt[0] + dr, nxt[1] + dc)
+                boxes.remove(nxt)
+                boxes.add(to)
+                self.deltas.append((player, nxt, nxt, to))
+            else:
+                self.deltas.append((player, nxt, None, None))
+            player = nxt
+
+    def _tile(self, cell: Cell, occupant: Optional[str]) -> str:
+        s = SokobanSolver
+        if cell in self.targets:
+            return {None: s.TARGET, 'box': s.BOX_ON_TARGET, 'player': s.PLAYER_ON_TARGET}[occupant]
+        return {None: s.FLOOR, 'box': s.BOX, 'player': s.PLAYER}[occupant]
+
+    def _set(self, cell: Cell, occupant: Optional[str]) -> None:
+        self.grid[cell[0]][cell[1]] = self._tile(cell, occupant)
+
+    def _move(self, player_from: Cell, player_to: Cell, box_from: Optional[Cell], box_to: Optional[Cell]) -> List[Cell]:
+        # 先清空原位置再放置，保证玩家与箱子互换格子（推箱/撤销推箱）时结果正确
+        self._set(player_from, None)
+        if box_from is not None:
+            self._set(box_from, None)
+            self.boxes.remove(box_from)
+            self.boxes.add(box_to)
+            self._set(box_to, 'box')
+        self._set(player_to, 'player')
+        self.player = player_to
+        changed = [player_from, player_to]
+        if box_from is not None:
+            changed += [box_from, box_to]
+        return changed
+
+    def step_forward(self) -> List[Cell]:
+        """前进一步，返回变化的格子；已在末尾时返回空列表。"""
+        if self.index >= len(self.moves):
+            return []
+        changed = self._move(*self.deltas[self.index])
+        self.index += 1
+        return changed
+
+    def step_back(self) -> List[Cell]:
+        """后退一步（撤销上一步的增量），返回变化的格子；已在开头时返回空列表。"""
+        if self.index <= 0:
+            return []
+        self.index -= 1
+        player_from, player_to, box_from, box_to = self.deltas[self.index]
+        return self._move(player_to, player_from, box_to, box_from)
+
+    def seek(self, index: int) -> List[Cell]:
+        """跳到第 index 步之后的局面，返回变化的格子。"""
+        index = max(0, min(index, len(self.moves)))
+        changed = set()
+        if abs(index - self.index) > self.keyframe_interval:
+            # 距离较远：直接恢复到目标之前最近的关键帧，只改动玩家与箱子所在的格子
+            k = index // self.keyframe_interval
+            if k >= len(self.keyframes):
+                k = len(self.keyframes) - 1
+            player, boxes = self.keyframes[k]
+            changed.add(self.player)
+            self._set(self.player, None)
+            for cell in self.boxes - boxes:
+                self._set(cell, None)
+                changed.add(cell)
+            for cell in boxes - self.boxes:
+                self._set(cell, 'box')
+                changed.add(cell)
+            self.boxes = set(boxes)
+            self.player = player
+            self._set(player, 'player')
+            changed.add(player)
+            self.index = k * self.keyframe_interval
+        while self.index < index:
+            changed.update(self.step_forward())
+        while self.index > index:
+            changed.update(self.step_back())
+        return list(changed)
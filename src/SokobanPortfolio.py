@@ -0,0 +1,78 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import List, Optional, Tuple
+
+from SokobanSolver import SokobanSolver
+
+# 每种配置：name 为名称，method 为调用的求解入口，其余键作为 SokobanSolver 构造参数；
+# optimal 表示该配置保证返回步数最少的解
+DEFAULT_CONFIGS = (
+    {'name': 'astar', 'method': 'solve', 'optimal': True},
+    {'name': 'push-level', 'method': 'solve', 'push_level': True, 'optimal': False},
+    {'name': 'weighted-astar', 'method': 'solve', 'weight': 3, 'optimal': False},
+    {'name': 'ida', 'method': 'solve_ida', 'optimal': True},
+)
+
+_NON_SOLVER_KEYS = ('name', 'method', 'optimal')
+
+
+def _run_config(board_map: List[str], config: dict) -> Optional[list]:
+    # 在工作进程中运行：按配置构造求解器并调用对应入口
+    kwargs = {k: v for k, v in config.items() if k not in _NON_SOLVER_KEYS}
+    solver = SokobanSolver(board_map, **kwargs)
+    return getattr(solver, config.get('method', 'solve'))()
+
+
+def _shutdown(executor: ProcessPoolExecutor) -> None:
+    # ProcessPoolExecutor 无法取消已开始的任务，直接终止仍在运行的工作进程
+    processes = list((getattr(executor, '_processes', None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def solve_portfolio(board_map: List[str], configs=DEFAULT_CONFIGS, require_optimal: bool = False,
+                    max_workers: Optional[int] = None) -> Tuple[Optional[list], Optional[str]]:
+    """
+    并行运行多种求解配置（最多 max_workers 个同时运行），返回 (路径, 配置名)。
+
+    require_optimal=False 时返回最先完成的有效解；为 True 时只接受 optimal 配置的解，
+    其他配置的解仅在没有最优配置可用时作为兜底。所有配置都是完备搜索，
+    任一配置返回 None 即证明无解，立即返回 (None, 配置名)。
+    得到结果后终止其余仍在运行的配置。
+    每个配置在各自的单进程池中运行：某个配置抛出异常或工作进程异常退出时只跳过该配置，
+    所有配置都失败时才抛出 RuntimeError。
+    """
+    pending = list(configs)
+    max_workers = max_workers or len(pending)
+    executors = []
+    running = {}  # future -> 配置
+    fallback = (None, None)
+    failures = []
+    try:
+        while pending or running:
+            while pending and len(running) < max_workers:
+                config = pending.pop(0)
+                executor = ProcessPoolExecutor(max_workers=1)
+                executors.append(executor)
+                running[executor.submit(_run_config, board_map, config)] = config
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                config = running.pop(future)
+                try:
+                    path = future.result()
+                except Exception as e:
+                    failures.append(f"{config['name']}: {e!r}")
+                    continue
+                if path is None:
+                    return None, config['name']
+                if not require_optimal or config.get('optimal', False):
+                    return path, config['name']
+                if fallback[0] is None:
+                    fallback = (path, config['name'])
+        if fallback[0] is None and failures:
+            raise RuntimeError("所有求解配置都失败：" + "；".join(failures))
+        return fallback
+    finally:
+        for executor in executors:
+            _shutdown(executor)
@@ -1,9 +1,46 @@
+import time
 import heapq
+import random
+
+from collections import deque
+from itertools import combinations
+from SokobanHeuristic import SokobanHeuristic, ReverseHeuristic
+from SokobanOpenList import BucketOpenList
+from SokobanClosedSet import DiskClosedSet
 
 class SokobanSolver:
     """
     Sokoban 问题的 A* 搜索求解器。
-    状态 (State): (玩家位置, 箱子位置集合)
+    状态 (State): (玩家格子编号, 箱子位掩码, Zobrist 哈希)
+
+    格子按 idx = r * cols + c 展平编号，箱子集合压缩为一个 Python int，
+    第 idx 位为 1 表示该格有箱子。visited / parent_map 以 boxes * size + player
+    这一精确的整数键索引；Zobrist 哈希随每一步增量更新，供定长表和按哈希分片等
+    允许冲突的场景使用。
+
+    push_level=True 时切换为推箱级搜索：节点为 (玩家可达区域的规范位置, 箱子位置集合)，
+    后继只包含玩家经洪水填充可达的推箱动作，求解后再补全行走步骤。
+    该模式以推箱次数为代价，返回推箱数最少的解。
+
+    weight > 1 时为加权 A*：f = g + weight * h，通常更快找到解，但不再保证最优。
+    solve() 可设置时间、扩展节点数、visited 规模三种预算；solve_anytime() 在预算内
+    先以大权重快速出解，再逐轮降低权重改进路径。
+
+    macros=True 时启用宏推箱：箱子进入一格宽的隧道后一次推出隧道，推箱级搜索中箱子到达
+    目标房间入口后直接推到房间内的空目标点。宏动作作为单个后继（代价为其中的步数），
+    大幅减少走廊较多关卡的节点数，但不再保证最优。
+
+    solve_bidirectional() 为双向推箱级搜索：正向从初始局面推箱、反向从所有终局拉箱，
+    两侧在共享的状态键上相遇后拼接出推箱数最少的解。
+
+    spill_dir 非空时，solve() / solve_anytime() 的 visited 与父指针改存在 DiskClosedSet 中：
+    内存中最多保留 spill_entries 个状态，其余写入该目录下的排序块文件，以磁盘 I/O 换内存。
+
+    推箱级搜索默认启用 PI-corral 剪枝（pi_corrals=False 关闭）：存在玩家进不去、边界箱子
+    只能往里推的围栏时，只生成推动这些边界箱子的后继，并检测围栏本身是否已经死锁。
+
+    patterns 为 PatternStore 时，每次推箱后查询其中的死锁模式，围栏死锁被证明时
+    再从中提取能在局部窗口内单独成立的模式写回模式库，供之后的求解复用。
     """
 
     WALL = '#'
@@ -14,136 +51,1158 @@ class SokobanSolver:
     BOX_ON_TARGET = '!'
     PLAYER_ON_TARGET = '+'
 
-    def __init__(self, board_map, debug=False):
+    MOVES = {'U': (-1, 0), 'D': (1, 0), 'L': (0, -1), 'R': (0, 1)}
+    # 与 MOVES 顺序对应的反方向下标
+    OPPOSITE = (1, 0, 3, 2)
+    # 默认每扩展多少个节点触发一次进度回调
+    PROGRESS_INTERVAL = 10000
+    # 各阶段耗时的抽样间隔（每多少次扩展计时一次）
+    TIMING_SAMPLE = 64
+    # solve_anytime() 默认的权重序列：先用大权重快速出解，最后一轮 weight=1 即最优 A*
+    ANYTIME_WEIGHTS = (5, 3, 2, 1.5, 1)
+    # 围栏死锁检测的松弛搜索最多访问的状态数，以及检测结果缓存的最大条目数
+    CORRAL_SEARCH_LIMIT = 200
+    CORRAL_CACHE_SIZE = 100000
+
+    def __init__(self, board_map, debug=False, push_level=False, weight=1, macros=False, pi_corrals=True,
+                 spill_dir=None, spill_entries=1 << 20, patterns=None):
         self.board_map = board_map
         self.rows = len(board_map)
-        self.cols = len(board_map[0])
+        self.cols = max(len(row) for row in board_map)
+        self.size = self.rows * self.cols
         self.targets = self._find_elements(self.TARGET)
         self.targets.update(self._find_elements(self.PLAYER_ON_TARGET))
         self.targets.update(self._find_elements(self.BOX_ON_TARGET))
         self.debug = debug
+        self.push_level = push_level
+        self.weight = weight
+        self.macros = macros
+        self.pi_corrals = pi_corrals
+        # 非空时 A* 的 visited / parent_map 改用可溢出到该目录的 DiskClosedSet
+        self.spill_dir = spill_dir
+        self.spill_entries = spill_entries
+        # 跨求解复用的死锁模式库（SokobanPatterns.PatternStore），为 None 时不查询也不记录
+        self.patterns = patterns
+        # 围栏死锁检测结果缓存：(玩家规范位置, 围栏箱子) -> 是否死锁，跨多次求解复用
+        self.corral_cache = {}
+        self.move_names = tuple(self.MOVES)
+        # step[d][idx]：从 idx 朝方向 d 走一步到达的格子编号，墙或越界为 -1
+        self.step = self._compute_steps()
+        self.target_mask = 0
+        for r, c in self.targets:
+            self.target_mask |= 1 << (r * self.cols + c)
+        # 静态死格表：按 r * cols + c 展平，True 表示箱子进入该格后再也无法到达任何目标点
+        self.dead_squares = self._compute_dead_squares()
+        # Zobrist 随机数表，固定种子保证同一地图的哈希在不同进程间一致
+        rng = random.Random(0)
+        self.zobrist_box = [rng.getrandbits(64) for _ in range(self.size)]
+        self.zobrist_player = [rng.getrandbits(64) for _ in range(self.size)]
+        # 宏推箱用的隧道表与目标房间（macros=True 时才计算）
+        self.tunnels = self._compute_tunnels() if macros else None
+        self.goal_rooms = self._compute_goal_rooms() if macros else {}
+        # 推箱距离与最小代价匹配启发函数
+        self.heuristic = SokobanHeuristic(self)
+        # 每个格子为中心的模式窗口，推箱后按箱子终点查询模式库
+        self.pattern_windows = patterns.windows(self) if patterns is not None else None
+        # 剪枝计数：每次 solve() 开始时清零
+        self._reset_stats()
 
     def _find_elements(self, symbol):
         positions = set()
         for r in range(self.rows):
-            for c in range(self.cols):
+            for c in range(len(self.board_map[r])):
                 if self.board_map[r][c] == symbol:
                     positions.add((r, c))
         return positions
 
+    def _compute_steps(self):
+        steps = []
+        for dr, dc in self.MOVES.values():
+            table = [-1] * self.size
+            for r in range(self.rows):
+                for c in range(self.cols):
+                    if not self._is_wall(r, c) and not self._is_wall(r + dr, c + dc):
+                        table[r * self.cols + c] = (r + dr) * self.cols + (c + dc)
+            steps.append(table)
+        return steps
+
+    def _index(self, pos):
+        return pos[0] * self.cols + pos[1]
+
+    def _position(self, idx):
+        return divmod(idx, self.cols)
+
+    def _iter_boxes(self, boxes):
+        # 依次取出位掩码中每个置位的格子编号
+        while boxes:
+            low = boxes & -boxes
+            yield low.bit_length() - 1
+            boxes ^= low
+
+    def _hash(self, player, boxes):
+        h = self.zobrist_player[player]
+        for idx in self._iter_boxes(boxes):
+            h ^= self.zobrist_box[idx]
+        return h
+
+    def _key(self, state):
+        # visited / parent_map 的精确键
+        player, boxes, _ = state
+        return boxes * self.size + player
+
     def _get_initial_state(self):
         player_pos = next(iter(self._find_elements(self.PLAYER) or self._find_elements(self.PLAYER_ON_TARGET)))
-        boxes = self._find_elements(self.BOX)
-        boxes.update(self._find_elements(self.BOX_ON_TARGET))
-        return (player_pos, frozenset(boxes))
+        player = self._index(player_pos)
+        boxes = 0
+        for pos in self._find_elements(self.BOX) | self._find_elements(self.BOX_ON_TARGET):
+            boxes |= 1 << self._index(pos)
+        return (player, boxes, self._hash(player, boxes))
 
     def _is_goal(self, state):
-        _, boxes = state
         # 当目标点数量 >= 箱子数量时，只需保证所有箱子位置都在某个目标点上
-        return set(boxes).issubset(self.targets)
-    
-    def _manhattan_distance(self, p1, p2):
-        return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
+        return state[1] & ~self.target_mask == 0
 
     def _heuristic(self, state):
-        _, boxes = state
-        h_score = 0
-        available_targets = list(self.targets)
-        for box_r, box_c in boxes:
-            if (box_r, box_c) in self.targets:
+        # 箱子与目标点的最优匹配推箱距离之和；无法匹配（死锁）时为 None
+        return self.heuristic.estimate(state[1])
+
+    def _next_heuristic(self, h_info, boxes, next_boxes):
+        # 行走不改变箱子，直接沿用父节点的匹配；推箱只移动一个箱子，增量更新
+        moved = boxes ^ next_boxes
+        if not moved:
+            return h_info
+        old_cell = (boxes & moved).bit_length() - 1
+        new_cell = (next_boxes & moved).bit_length() - 1
+        return self.heuristic.update(h_info, old_cell, new_cell)
+
+    def _reset_stats(self):
+        """
+        搜索统计量，每次求解开始时清零：
+        expanded/generated 扩展与入队的节点数，duplicates 重复到达且未改进 g 的后继，
+        stale 惰性删除丢弃的旧条目，pruned_* 各类死锁剪枝次数（pruned_bound 为 anytime 模式下
+        因不可能改进当前解而剪掉的节点，pruned_corral_deadlock 为围栏死锁剪掉的节点），
+        pruned_pattern 为命中死锁模式库剪掉的后继，patterns_learned 为本次新记录的模式数，
+        pi_corrals 因 PI-corral 只生成边界箱子推动的节点数，macro_moves 生成的宏动作后继数，
+        budget_exhausted 表示搜索因预算耗尽而提前停止，open_peak 开放列表峰值，
+        visited/open_size 当前规模，time_* 为总耗时及抽样估算的后继生成/启发函数/开放列表耗时（秒）。
+        """
+        self.stats = {
+            'expanded': 0, 'generated': 0, 'duplicates': 0, 'stale': 0,
+            'pruned_dead_square': 0, 'pruned_freeze': 0, 'pruned_matching': 0, 'pruned_bound': 0,
+            'pruned_corral_deadlock': 0, 'pruned_pattern': 0, 'patterns_learned': 0,
+            'pi_corrals': 0, 'macro_moves': 0, 'budget_exhausted': False,
+            'open_peak': 0, 'visited': 0, 'open_size': 0,
+            'time_total': 0.0, 'time_successors': 0.0, 'time_heuristic': 0.0, 'time_open_list': 0.0,
+        }
+
+    def _is_wall(self, r, c):
+        # 越界（含不规则行长度）一律视为墙
+        if r < 0 or r >= self.rows or c < 0 or c >= len(self.board_map[r]):
+            return True
+        return self.board_map[r][c] == self.WALL
+
+    def _compute_dead_squares(self):
+        """
+        从所有目标点出发做反向“拉箱子”BFS，一次性计算静态死格表。
+
+        箱子从 q 被拉到 p = q - d 需要 p 与 p - d（玩家站位）均不是墙；
+        凡是拉不到的非墙格子，箱子一旦进入就无法再被推到任何目标点
+        （包括墙角以及两端没有出口的贴墙死线段）。
+        """
+        live = set(self.targets)
+        queue = deque(self.targets)
+        while queue:
+            r, c = queue.popleft()
+            for dr, dc in self.MOVES.values():
+                pr, pc = r - dr, c - dc
+                if (pr, pc) in live or self._is_wall(pr, pc) or self._is_wall(pr - dr, pc - dc):
+                    continue
+                live.add((pr, pc))
+                queue.append((pr, pc))
+        dead = [False] * (self.rows * self.cols)
+        for r in range(self.rows):
+            for c in range(self.cols):
+                if not self._is_wall(r, c) and (r, c) not in live:
+                    dead[r * self.cols + c] = True
+        return dead
+
+    def _is_freeze_deadlock(self, box, boxes):
+        """
+        动态冻结死锁检测（推箱后调用）。
+
+        若刚被推动的箱子在水平、竖直两个方向上都无法再移动，则它与阻挡它的箱子
+        组成一个冻结簇；簇中只要有一个箱子不在目标点上，该状态即为死锁。
+        2x2 方块、贴墙并排的两个箱子都属于这种情况。
+        """
+        cluster = self._frozen_cluster(box, boxes, set())
+        return cluster is not None and cluster & ~self.target_mask != 0
+
+    def _frozen_cluster(self, box, boxes, ancestors):
+        # 返回包含 box 的冻结簇（位掩码）；box 未冻结时返回 None
+        # 递归路径上的箱子视为墙，避免互相阻挡时无限递归
+        ancestors.add(box)
+        cluster = 1 << box
+        for axis in ((2, 3), (0, 1)):
+            blockers = self._blocked_along(box, axis, boxes, ancestors)
+            if blockers is None:
+                cluster = None
+                break
+            cluster |= blockers
+        ancestors.discard(box)
+        return cluster
+
+    def _blocked_along(self, box, axis, boxes, ancestors):
+        # 判断箱子在某一轴向上是否被堵死：返回参与阻挡的冻结箱子掩码，未堵死时返回 None
+        before, after = self.step[axis[0]][box], self.step[axis[1]][box]
+        if before < 0 or after < 0:
+            return 0
+        if self.dead_squares[before] and self.dead_squares[after]:
+            return 0
+        for neighbor in (before, after):
+            if neighbor in ancestors:
+                return 0
+            if boxes >> neighbor & 1:
+                sub_cluster = self._frozen_cluster(neighbor, boxes, ancestors)
+                if sub_cluster is not None:
+                    return sub_cluster
+        return None
+
+    def check_feasibility(self):
+        """
+        求解前的快速可行性检查，只做线性规模的静态分析，不展开搜索。
+
+        发现必然无解（或地图不合法）时返回 (原因代码, 说明)，否则返回 None（不代表一定有解）：
+        no_player 没有玩家；too_few_targets 目标点少于箱子；box_unreachable 箱子位于玩家
+        无论如何都走不到的区域且不在目标点上；too_few_reachable_targets 玩家所在区域内的目标点
+        少于该区域内的箱子；box_on_dead_square 箱子位于静态死格；frozen 初始局面已有冻结死锁；
+        unmatched_boxes 箱子无法各自推到不同的目标点（推箱距离上不存在完全匹配）。
+        """
+        if not (self._find_elements(self.PLAYER) or self._find_elements(self.PLAYER_ON_TARGET)):
+            return 'no_player', "地图中没有玩家"
+        player, boxes, _ = self._get_initial_state()
+        box_cells = list(self._iter_boxes(boxes))
+        if len(box_cells) > len(self.targets):
+            return 'too_few_targets', f"箱子 {len(box_cells)} 个，目标点只有 {len(self.targets)} 个"
+        # 忽略箱子时玩家所在的连通区域：箱子只会在区域内移动，区域外的箱子永远推不动
+        region = self._reachable(player, 0)
+        for box in box_cells:
+            if box not in region and not self.target_mask >> box & 1:
+                return 'box_unreachable', f"箱子 {self._position(box)} 位于玩家无法到达的区域"
+        inside_boxes = sum(1 for box in box_cells if box in region)
+        inside_targets = sum(1 for r, c in self.targets if self._index((r, c)) in region)
+        if inside_targets < inside_boxes:
+            return 'too_few_reachable_targets', f"玩家可达区域内有 {inside_boxes} 个箱子，目标点只有 {inside_targets} 个"
+        for box in box_cells:
+            if self.dead_squares[box]:
+                return 'box_on_dead_square', f"箱子 {self._position(box)} 位于死格，无法推到任何目标点"
+        for box in box_cells:
+            if self.target_mask >> box & 1:
                 continue
-            min_dist = float('inf')
-            best_target_index = -1
-            for i, (target_r, target_c) in enumerate(available_targets):
-                dist = self._manhattan_distance((box_r, box_c), (target_r, target_c))
-                if dist < min_dist:
-                    min_dist = dist
-                    best_target_index = i
-            if best_target_index != -1:
-                h_score += min_dist
-                available_targets.pop(best_target_index) 
-        return h_score
+            cluster = self._frozen_cluster(box, boxes, set())
+            if cluster is not None:
+                return 'frozen', f"箱子 {self._position(box)} 已被冻结，无法再推动"
+        if self.heuristic.initial(boxes) is None:
+            return 'unmatched_boxes', "箱子无法各自推到不同的目标点"
+        return None
+
+    def _compute_tunnels(self):
+        """
+        隧道表：tunnels[d][x] 为 True 表示箱子沿方向 d 被推到 x 后，x 与玩家所在的 x 后方一格
+        在垂直方向上两侧都是墙（一格宽的通道），且 x 不是目标点。
+        此时玩家除了继续推这个箱子只能原路退回，宏推箱直接把箱子推出隧道。
+        """
+        tunnels = []
+        for d in range(4):
+            sides = (2, 3) if d < 2 else (0, 1)
+            table = [False] * self.size
+            for x in range(self.size):
+                behind = self.step[self.OPPOSITE[d]][x]
+                if behind < 0 or self.target_mask >> x & 1:
+                    continue
+                if all(self.step[s][x] < 0 and self.step[s][behind] < 0 for s in sides):
+                    table[x] = True
+            tunnels.append(table)
+        return tunnels
+
+    def _compute_goal_rooms(self):
+        """
+        目标房间：由相邻目标点组成、且只有一个入口格的连通区域（至少两个目标点）。
+        返回 {入口格: (房间格子集合, 填充顺序)}，填充顺序按到入口的距离由远到近，
+        先填最里面的目标点，避免先到的箱子挡住后来的箱子。
+        """
+        targets = {self._index(pos) for pos in self.targets}
+        rooms = {}
+        seen = set()
+        for start in targets:
+            if start in seen:
+                continue
+            room = {start}
+            queue = deque([start])
+            while queue:
+                cur = queue.popleft()
+                for table in self.step:
+                    nxt = table[cur]
+                    if nxt in targets and nxt not in room:
+                        room.add(nxt)
+                        queue.append(nxt)
+            seen |= room
+            entrances = {table[cell] for cell in room for table in self.step if table[cell] >= 0} - room
+            if len(room) < 2 or len(entrances) != 1:
+                continue
+            entrance = entrances.pop()
+            dist = {entrance: 0}
+            queue = deque([entrance])
+            while queue:
+                cur = queue.popleft()
+                for table in self.step:
+                    nxt = table[cur]
+                    if nxt in room and nxt not in dist:
+                        dist[nxt] = dist[cur] + 1
+                        queue.append(nxt)
+            order = tuple(sorted(room, key=lambda cell: -dist.get(cell, 0)))
+            rooms[entrance] = (frozenset(room), order)
+        return rooms
+
+    def _tunnel_pushes(self, box, d, boxes):
+        """箱子刚沿方向 d 被推到 box：若处于隧道中则继续推，返回追加的推箱终点列表（可能为空）。"""
+        tunnel, step, dead = self.tunnels[d], self.step[d], self.dead_squares
+        cells = []
+        while tunnel[box]:
+            ahead = step[box]
+            if ahead < 0 or boxes >> ahead & 1 or dead[ahead]:
+                break
+            boxes ^= (1 << box) | (1 << ahead)
+            cells.append(ahead)
+            box = ahead
+        return cells
+
+    def _goal_room_pushes(self, box, player, boxes):
+        """
+        箱子位于目标房间入口时，用一次小范围 BFS 求出把它推到房间内下一个空目标点的推箱序列
+        [(箱子原格子编号, 方向), ...]；其他箱子不动，箱子只在入口与房间内移动。无法做到时返回 None。
+        """
+        room, order = self.goal_rooms[box]
+        slot = next((cell for cell in order if not boxes >> cell & 1), None)
+        if slot is None:
+            return None
+        others = boxes & ~(1 << box)
+        seen = {(box, min(self._reachable(player, boxes)))}
+        queue = deque([(box, player, [])])
+        while queue:
+            cur, pos, pushes = queue.popleft()
+            reachable = self._reachable(pos, others | (1 << cur))
+            for d, move in enumerate(self.move_names):
+                if self.step[self.OPPOSITE[d]][cur] not in reachable:
+                    continue
+                dest = self.step[d][cur]
+                if dest not in room or others >> dest & 1:
+                    continue
+                path = pushes + [(cur, move)]
+                if dest == slot:
+                    return path
+                key = (dest, min(self._reachable(cur, others | (1 << dest))))
+                if key in seen:
+                    continue
+                seen.add(key)
+                queue.append((dest, cur, path))
+        return None
+
+    def _finish_path(self, path):
+        # 展开宏动作（列表）为单步动作；推箱级搜索再补全行走步骤
+        flat = []
+        for move in path:
+            if move.__class__ is list:
+                flat.extend(move)
+            else:
+                flat.append(move)
+        if self.push_level:
+            return self._expand_pushes(flat)
+        return flat
 
     def _get_next_states(self, state):
-        (pr, pc), boxes = state
+        player, boxes, zhash = state
+        zobrist_player, zobrist_box = self.zobrist_player, self.zobrist_box
         next_states = []
-        moves = {'U': (-1, 0), 'D': (1, 0), 'L': (0, -1), 'R': (0, 1)}
 
-        def is_deadlock(r, c):
-            # 死角判定：上下或左右均为墙，且不是目标点
-            if (r, c) in self.targets:
-                return False
-            wall_up = r - 1 < 0 or self.board_map[r - 1][c] == self.WALL
-            wall_down = r + 1 >= self.rows or self.board_map[r + 1][c] == self.WALL
-            wall_left = c - 1 < 0 or self.board_map[r][c - 1] == self.WALL
-            wall_right = c + 1 >= self.cols or self.board_map[r][c + 1] == self.WALL
-            # 角落死角（上下或左右均为墙）
-            if (wall_up and wall_left) or (wall_up and wall_right) or (wall_down and wall_left) or (wall_down and wall_right):
-                return True
-            return False
-
-        for move, (dr, dc) in moves.items():
-            npr, npc = pr + dr, pc + dc
+        for d, move in enumerate(self.move_names):
+            nxt = self.step[d][player]
             # 判断边界和墙壁
-            if npr < 0 or npr >= self.rows or npc < 0 or npc >= self.cols:
-                continue
-            if self.board_map[npr][npc] == self.WALL:
+            if nxt < 0:
                 continue
-            if (npr, npc) in boxes:
-                nbr, nbc = npr + dr, npc + dc
-                if self.board_map[nbr][nbc] != self.WALL and (nbr, nbc) not in boxes:
-                    # 死角剪枝：箱子被推到死角且不是目标点，直接跳过
-                    if is_deadlock(nbr, nbc):
+            new_hash = zhash ^ zobrist_player[player] ^ zobrist_player[nxt]
+            if boxes >> nxt & 1:
+                dest = self.step[d][nxt]
+                if dest < 0 or boxes >> dest & 1:
+                    continue
+                # 死格剪枝：箱子被推到静态死格，直接跳过
+                if self.dead_squares[dest]:
+                    self.stats['pruned_dead_square'] += 1
+                    continue
+                new_boxes = boxes ^ (1 << nxt) ^ (1 << dest)
+                # 冻结剪枝：被推动的箱子与相邻箱子互相卡死
+                if self._is_freeze_deadlock(dest, new_boxes):
+                    self.stats['pruned_freeze'] += 1
+                    continue
+                # 模式剪枝：箱子终点附近的布局包含已知的死锁模式
+                if self.patterns is not None and self.patterns.matches(self.pattern_windows[dest], new_boxes, nxt):
+                    self.stats['pruned_pattern'] += 1
+                    continue
+                new_hash ^= zobrist_box[nxt] ^ zobrist_box[dest]
+                if self.macros:
+                    cells = self._tunnel_pushes(dest, d, new_boxes)
+                    if cells:
+                        # 宏推箱：沿隧道连续推到底，玩家停在箱子最终位置的后方
+                        end = cells[-1]
+                        behind = self.step[self.OPPOSITE[d]][end]
+                        new_boxes ^= (1 << dest) | (1 << end)
+                        if self._is_freeze_deadlock(end, new_boxes):
+                            self.stats['pruned_freeze'] += 1
+                            continue
+                        new_hash ^= zobrist_box[dest] ^ zobrist_box[end] ^ zobrist_player[nxt] ^ zobrist_player[behind]
+                        self.stats['macro_moves'] += 1
+                        next_states.append(((behind, new_boxes, new_hash), [move.upper()] * (len(cells) + 1)))
                         continue
-                    new_boxes = set(boxes)
-                    new_boxes.remove((npr, npc))
-                    new_boxes.add((nbr, nbc))
-                    next_state = ((npr, npc), frozenset(new_boxes))
-                    next_states.append((next_state, move.upper()))
+                next_states.append(((nxt, new_boxes, new_hash), move.upper()))
             else:
-                next_state = ((npr, npc), boxes)
-                next_states.append((next_state, move.lower()))
+                next_states.append(((nxt, boxes, new_hash), move.lower()))
         return next_states
 
-    def solve(self):
+    def _reachable(self, player, boxes):
+        """洪水填充：返回玩家在不推动箱子的前提下可到达的所有格子编号。"""
+        reachable = {player}
+        queue = deque([player])
+        while queue:
+            cur = queue.popleft()
+            for table in self.step:
+                nxt = table[cur]
+                if nxt < 0 or nxt in reachable or boxes >> nxt & 1:
+                    continue
+                reachable.add(nxt)
+                queue.append(nxt)
+        return reachable
+
+    def _normalize(self, state):
+        # 规范化：用可达区域中最小的格子代表整个玩家区域
+        player, boxes, zhash = state
+        canonical = min(self._reachable(player, boxes))
+        return (canonical, boxes, zhash ^ self.zobrist_player[player] ^ self.zobrist_player[canonical])
+
+    def _get_push_states(self, state):
+        """
+        推箱级后继：只生成玩家可达的推箱动作，move 记为 (箱子原格子编号, 方向)。
+        存在 PI-corral 时只推动其边界箱子；围栏已死锁时没有后继。
+        """
+        player, boxes, zhash = state
+        reachable = self._reachable(player, boxes)
+        zobrist_box = self.zobrist_box
+        next_states = []
+        movable = boxes
+        if self.pi_corrals:
+            corral = self._find_pi_corral(boxes, reachable)
+            if corral is not None:
+                corral_boxes, movable = corral
+                if self._corral_deadlocked(corral_boxes, player):
+                    self.stats['pruned_corral_deadlock'] += 1
+                    return next_states
+                self.stats['pi_corrals'] += 1
+        for box in self._iter_boxes(movable):
+            for d, move in enumerate(self.move_names):
+                if self.step[self.OPPOSITE[d]][box] not in reachable:
+                    continue
+                dest = self.step[d][box]
+                if dest < 0 or boxes >> dest & 1:
+                    continue
+                if self.dead_squares[dest]:
+                    self.stats['pruned_dead_square'] += 1
+                    continue
+                new_boxes = boxes ^ (1 << box) ^ (1 << dest)
+                if self._is_freeze_deadlock(dest, new_boxes):
+                    self.stats['pruned_freeze'] += 1
+                    continue
+                if self.patterns is not None and self.patterns.matches(self.pattern_windows[dest], new_boxes, box):
+                    self.stats['pruned_pattern'] += 1
+                    continue
+                # 推完后玩家站在箱子原位置
+                new_hash = zhash ^ zobrist_box[box] ^ zobrist_box[dest]
+                if self.macros:
+                    macro = self._push_macro(box, d, dest, new_boxes)
+                    if macro is not None:
+                        end, pusher, pushes = macro
+                        end_boxes = boxes ^ (1 << box) ^ (1 << end)
+                        if end != dest and self._is_freeze_deadlock(end, end_boxes):
+                            self.stats['pruned_freeze'] += 1
+                            continue
+                        end_hash = zhash ^ zobrist_box[box] ^ zobrist_box[end]
+                        next_state = self._normalize((pusher, end_boxes, end_hash ^ self.zobrist_player[player] ^ self.zobrist_player[pusher]))
+                        self.stats['macro_moves'] += 1
+                        next_states.append((next_state, pushes))
+                        continue
+                next_state = self._normalize((box, new_boxes, new_hash ^ self.zobrist_player[player] ^ self.zobrist_player[box]))
+                next_states.append((next_state, (box, move)))
+        return next_states
+
+    def _get_pull_states(self, state):
+        """
+        双向搜索中反向搜索的后继：把一个箱子朝玩家一侧拉一格，玩家随之后退一格。
+        move 记为从后继状态推回当前状态的正向推箱 (箱子原格子编号, 方向)，与推箱级搜索一致。
+        """
+        player, boxes, zhash = state
+        reachable = self._reachable(player, boxes)
+        step, opposite = self.step, self.OPPOSITE
+        zobrist_box, zobrist_player = self.zobrist_box, self.zobrist_player
+        prev_states = []
+        for box in self._iter_boxes(boxes):
+            for d, move in enumerate(self.move_names):
+                # 对应的正向推箱：玩家站在 behind，把 cell 上的箱子沿方向 d 推到 box
+                cell = step[opposite[d]][box]
+                if cell not in reachable:
+                    continue
+                behind = step[opposite[d]][cell]
+                if behind < 0 or boxes >> behind & 1:
+                    continue
+                new_boxes = boxes ^ (1 << box) ^ (1 << cell)
+                new_hash = zhash ^ zobrist_box[box] ^ zobrist_box[cell] ^ zobrist_player[player] ^ zobrist_player[behind]
+                prev_states.append((self._normalize((behind, new_boxes, new_hash)), (cell, move)))
+        return prev_states
+
+    def _find_pi_corral(self, boxes, reachable):
+        """
+        查找 PI-corral（玩家无法进入的围栏区域），返回 (围栏内全部箱子, 边界箱子) 位掩码；没有时返回 None。
+
+        围栏是玩家可达区域之外、穿过箱子连通的一片格子。若边界箱子（与可达区域相邻的箱子）
+        所有合法的推动都只能推进围栏内部，且围栏尚未完成（有箱子不在目标点，或目标点恰好够用
+        而围栏内还有空目标点），则解中迟早要推动某个边界箱子进入围栏，其他推箱可以先放一放。
+        有多个时取可推动作最少的一个。
+        """
+        step, opposite, dead = self.step, self.OPPOSITE, self.dead_squares
+        spare_targets = len(self.targets) > bin(boxes).count('1')
+        assigned = set(reachable)
+        best = None
+        for box in self._iter_boxes(boxes):
+            if box in assigned or all(step[d][box] not in reachable for d in range(4)):
+                continue
+            corral = {box}
+            queue = deque([box])
+            while queue:
+                cur = queue.popleft()
+                for table in step:
+                    nxt = table[cur]
+                    if nxt >= 0 and nxt not in corral and nxt not in reachable:
+                        corral.add(nxt)
+                        queue.append(nxt)
+            assigned |= corral
+            corral_boxes = sum(1 << cell for cell in corral if boxes >> cell & 1)
+            if corral_boxes == sum(1 << cell for cell in corral):
+                continue
+            unsolved = corral_boxes & ~self.target_mask or (not spare_targets and any(
+                self.target_mask >> cell & 1 and not boxes >> cell & 1 for cell in corral))
+            if not unsolved:
+                continue
+            barrier, pushes = 0, 0
+            for cell in self._iter_boxes(corral_boxes):
+                if all(step[d][cell] not in reachable for d in range(4)):
+                    continue
+                barrier |= 1 << cell
+                for d in range(4):
+                    side, dest = step[opposite[d]][cell], step[d][cell]
+                    if side not in reachable or dest < 0 or dead[dest]:
+                        continue
+                    if dest not in corral:
+                        # 边界箱子可以被推到围栏外（或被围栏外的箱子挡住），不是 PI-corral
+                        break
+                    if not boxes >> dest & 1:
+                        pushes += 1
+                else:
+                    continue
+                break
+            else:
+                if best is None or pushes < best[0]:
+                    best = (pushes, corral_boxes, barrier)
+        return None if best is None else best[1:]
+
+    def _corral_deadlocked(self, corral_boxes, player):
+        """
+        围栏死锁检测：只保留围栏内的箱子，在这个松弛问题上做小规模推箱级搜索（按启发值贪心），
+        看能否把它们全部推上目标点。去掉其他箱子只会让问题更容易，因此松弛问题无解
+        即原局面死锁；超过 CORRAL_SEARCH_LIMIT 个状态仍未定论时按未死锁处理。
+        结果按 (玩家规范位置, 围栏箱子) 缓存，同一箱子布局只判断一次。
+        判定为死锁且提供了模式库时，以围栏内每个箱子为中心尝试提取死锁模式。
+        """
+        region = self._reachable(player, corral_boxes)
+        start = (min(region), corral_boxes)
+        cached = self.corral_cache.get(start)
+        if cached is not None:
+            return cached
+        step, opposite = self.step, self.OPPOSITE
+        seen = {start}
+        heap = [(0, start)]
+        # 围栏内箱子已全部在目标点上（只是还有空目标点）时松弛问题已经解决
+        deadlocked = bool(corral_boxes & ~self.target_mask)
+        while heap and deadlocked:
+            if len(seen) > self.CORRAL_SEARCH_LIMIT:
+                deadlocked = False
+                break
+            player, boxes = heapq.heappop(heap)[1]
+            reachable = self._reachable(player, boxes)
+            for box in self._iter_boxes(boxes):
+                for d in range(4):
+                    dest = step[d][box]
+                    if step[opposite[d]][box] not in reachable or dest < 0 or boxes >> dest & 1 or self.dead_squares[dest]:
+                        continue
+                    new_boxes = boxes ^ (1 << box) ^ (1 << dest)
+                    if not new_boxes & ~self.target_mask:
+                        deadlocked = False
+                        break
+                    if self._is_freeze_deadlock(dest, new_boxes):
+                        continue
+                    h = self.heuristic.estimate(new_boxes)
+                    if h is None:
+                        continue
+                    key = (min(self._reachable(box, new_boxes)), new_boxes)
+                    if key not in seen:
+                        seen.add(key)
+                        heapq.heappush(heap, (h, key))
+                if not deadlocked:
+                    break
+        if len(self.corral_cache) >= self.CORRAL_CACHE_SIZE:
+            self.corral_cache.clear()
+        self.corral_cache[start] = deadlocked
+        if deadlocked and self.patterns is not None:
+            for box in self._iter_boxes(corral_boxes):
+                if self.patterns.learn(self.pattern_windows[box], corral_boxes, region):
+                    self.stats['patterns_learned'] += 1
+        return deadlocked
+
+    def _push_macro(self, box, d, dest, boxes):
+        """
+        推箱级宏动作：箱子从 box 沿方向 d 推到 dest 后，先沿隧道推到底，若停在目标房间入口
+        再推到房间内的空目标点。返回 (箱子终点, 玩家终点, 推箱序列)；不构成宏动作时返回 None。
+        """
+        move = self.move_names[d]
+        pushes = [(box, move)]
+        end, pusher = dest, box
+        for cell in self._tunnel_pushes(dest, d, boxes):
+            pushes.append((end, move))
+            end, pusher = cell, end
+        # 只对从房间外推来的箱子使用，箱子从房间里被推出来时仍按普通推箱处理
+        if end in self.goal_rooms and box not in self.goal_rooms[end][0]:
+            end_boxes = boxes ^ (1 << dest) ^ (1 << end)
+            room_pushes = self._goal_room_pushes(end, pusher, end_boxes)
+            if room_pushes:
+                pushes.extend(room_pushes)
+                pusher, last_move = room_pushes[-1]
+                end = self.step[self.move_names.index(last_move)][pusher]
+        if len(pushes) == 1:
+            return None
+        return end, pusher, pushes
+
+    def _walk_path(self, start, goal, boxes):
+        """BFS 求玩家从 start 走到 goal 的最短行走序列（小写字母），不可达时返回 None。"""
+        if start == goal:
+            return []
+        came_from = {start: None}
+        queue = deque([start])
+        while queue:
+            cur = queue.popleft()
+            for d, move in enumerate(self.move_names):
+                nxt = self.step[d][cur]
+                if nxt < 0 or nxt in came_from or boxes >> nxt & 1:
+                    continue
+                came_from[nxt] = (cur, move.lower())
+                if nxt == goal:
+                    walk = []
+                    while came_from[nxt] is not None:
+                        nxt, step = came_from[nxt]
+                        walk.append(step)
+                    walk.reverse()
+                    return walk
+                queue.append(nxt)
+        return None
+
+    def _expand_pushes(self, pushes):
+        """把推箱序列还原为 GUI 回放用的 U/D/L/R/u/d/l/r 逐步路径。"""
+        player, boxes, _ = self._get_initial_state()
+        path = []
+        for box, move in pushes:
+            d = self.move_names.index(move)
+            walk = self._walk_path(player, self.step[self.OPPOSITE[d]][box], boxes)
+            if walk is None:
+                raise ValueError(f"推箱序列不合法：玩家无法走到箱子 {self._position(box)} 的推箱位置")
+            path.extend(walk)
+            path.append(move)
+            boxes ^= (1 << box) ^ (1 << self.step[d][box])
+            player = box
+        return path
+
+    def _search_start(self):
+        # 按搜索模式返回起始状态与后继生成函数
         start_state = self._get_initial_state()
-        priority_queue = [(self._heuristic(start_state), 0, start_state, None, None)]  # (f, g, state, parent, move)
-        visited = {start_state: 0}
-        parent_map = {}  # state -> (parent_state, move)
-        goal_state = None
-        step = 0
-        while priority_queue:
-            f_score, g_score, current_state, parent_state, move = heapq.heappop(priority_queue)
-            if parent_state is not None:
-                parent_map[current_state] = (parent_state, move)
+        if self.push_level:
+            return self._normalize(start_state), self._get_push_states
+        return start_state, self._get_next_states
+
+    def _snapshot(self, visited_size, open_size, start_time):
+        # 刷新随时间变化的统计量，返回一份副本供进度回调使用
+        self.stats['visited'] = visited_size
+        self.stats['open_size'] = open_size
+        self.stats['time_total'] = time.perf_counter() - start_time
+        return dict(self.stats)
+
+    def _print_progress(self, stats):
+        # debug 模式下的默认进度输出（每 progress_interval 次扩展一行，而非每个节点一行）
+        print(f"[Search] expanded={stats['expanded']}, generated={stats['generated']}, "
+              f"duplicates={stats['duplicates']}, open={stats['open_size']}, visited={stats['visited']}, "
+              f"pruned(dead/freeze/matching)={stats['pruned_dead_square']}/{stats['pruned_freeze']}/"
+              f"{stats['pruned_matching']}, time={stats['time_total']:.2f}s")
+
+    def solve(self, progress=None, progress_interval=None, time_limit=None, max_expanded=None, max_visited=None):
+        """
+        A* 求解，返回移动序列（大写为推箱）；无解时返回 None。
+
+        progress 为可选回调，每扩展 progress_interval 个节点以 self.stats 的副本调用一次；
+        debug=True 且未提供回调时改为打印一行进度。
+        time_limit（秒）、max_expanded、max_visited 为可选的搜索预算，任一耗尽即停止并返回 None，
+        此时 stats['budget_exhausted'] 为 True，以区别于证明无解。
+        """
+        self._reset_stats()
+        start_time = time.perf_counter()
+        deadline = start_time + time_limit if time_limit is not None else None
+        result = self._astar(self.weight, None, start_time, deadline, max_expanded, max_visited,
+                             progress, progress_interval)
+        if self.debug:
+            self._print_progress(self.stats)
+        if result is None:
             if self.debug:
-                player, boxes = current_state
-                print(f"[A* Step {step}] f={f_score}, g={g_score}, player={player}, boxes={sorted(boxes)}, move={move}")
+                print("[A*] Search budget exhausted." if self.stats['budget_exhausted'] else "[A*] No solution found.")
+            return None
+        path = self._finish_path(result[0])
+        if self.debug:
+            print(f"[A*] Solution found. Steps: {len(path)}. Path: {''.join(path)}")
+        return path
+
+    def solve_anytime(self, weights=None, time_limit=None, max_expanded=None, max_visited=None,
+                      progress=None, progress_interval=None, on_solution=None):
+        """
+        Anytime 加权 A*：依次以 weights 中递减的权重重新搜索，先用大权重快速得到一个解，
+        之后每一轮只保留 g + h 小于当前最优代价的节点，逐步改进路径，直到预算耗尽。
+
+        预算含义同 solve()，在各轮之间累计（max_visited 按单轮计）。返回目前最好的解，
+        一个解都没找到时返回 None。on_solution 为可选回调，每找到更好的解时以完整路径调用。
+        结束后 stats['optimal'] 表示返回的解是否已被证明最优（权重降到 1 或某一轮证明无法再改进），
+        stats['anytime_weight'] 为得到该解时的权重。
+        """
+        self._reset_stats()
+        stats = self.stats
+        weights = self.ANYTIME_WEIGHTS if weights is None else weights
+        stats['optimal'] = False
+        stats['anytime_weight'] = None
+        start_time = time.perf_counter()
+        deadline = start_time + time_limit if time_limit is not None else None
+        best_path = None
+        best_cost = None
+        for weight in weights:
+            result = self._astar(weight, best_cost, start_time, deadline, max_expanded, max_visited,
+                                 progress, progress_interval)
+            if stats['budget_exhausted']:
+                break
+            if result is None:
+                # 本轮完整搜索结束仍未找到更短的解：无界时说明无解，有界时说明当前解已最优
+                stats['optimal'] = best_path is not None
+                break
+            raw_path, best_cost = result
+            best_path = self._finish_path(raw_path)
+            stats['anytime_weight'] = weight
+            if self.debug:
+                print(f"[Anytime] weight={weight}, cost={best_cost}, elapsed={time.perf_counter() - start_time:.2f}s")
+            if on_solution is not None:
+                on_solution(best_path)
+            if weight <= 1:
+                stats['optimal'] = True
+                break
+        self._snapshot(stats['visited'], stats['open_size'], start_time)
+        if self.debug:
+            self._print_progress(stats)
+            if best_path is None:
+                print("[Anytime] No solution found.")
+        return best_path
+
+    def _astar(self, weight, bound, start_time, deadline, max_expanded, max_visited, progress, progress_interval):
+        """
+        一轮（加权）A* 搜索，返回 (未补全的路径, 代价)；无解或预算耗尽时返回 None。
+
+        bound 非空时剪掉 g + h >= bound 的节点，只寻找比 bound 更短的解。
+        统计量在 self.stats 上累加，供 solve_anytime() 多轮共用。
+        """
+        stats = self.stats
+        if progress is None and self.debug:
+            progress = self._print_progress
+        interval = progress_interval or self.PROGRESS_INTERVAL
+        sample = self.TIMING_SAMPLE
+        expanded_before = stats['expanded']
+        start_state, get_next_states = self._search_start()
+        start_key = self._key(start_state)
+        start_info = self.heuristic.initial(start_state[1])
+        if start_info is None:
+            if self.debug:
+                print("[A*] Initial state is a deadlock.")
+            return None
+        # 条目为 (key, state, parent_key, move, h_info)，h_info 为随节点携带的匹配信息
+        open_list = BucketOpenList()
+        open_list.push(int(start_info[0] * weight), 0, (start_key, start_state, None, None, start_info))
+        if self.spill_dir is None:
+            visited = {}
+            parent_map = {}  # key -> (parent_key, move)
+        else:
+            visited = DiskClosedSet(self, self.spill_dir, self.spill_entries)
+            parent_map = visited.parents
+        visited[start_key] = 0
+        goal_key = None
+        goal_g = None
+        step = 0
+        open_peak = max(stats['open_peak'], 1)
+        # 每 TIMING_SAMPLE 次扩展抽样计时一次，最后按比例放大，估算各阶段耗时
+        time_successors = time_heuristic = time_open_list = 0.0
+        while open_list:
+            timed = step % sample == 0
+            if timed:
+                t0 = time.perf_counter()
+            f_score, g_score, (current_key, current_state, parent_key, move, h_info) = open_list.pop()
+            if timed:
+                time_open_list += time.perf_counter() - t0
+            # 惰性删除：该状态之后又以更小的 g 入队过，这个旧条目已被取代
+            if g_score > visited[current_key]:
+                stats['stale'] += 1
+                continue
+            if parent_key is not None:
+                parent_map[current_key] = (parent_key, move)
             if self._is_goal(current_state):
-                goal_state = current_state
-                if self.debug:
-                    print(f"[A*] Goal reached at step {step}!")
+                goal_key = current_key
+                goal_g = g_score
+                break
+            # 预算检查；读时钟相对较慢，只在抽样计时的那次扩展上检查时间
+            if ((max_expanded is not None and expanded_before + step >= max_expanded)
+                    or (max_visited is not None and len(visited) >= max_visited)
+                    or (deadline is not None and timed and time.perf_counter() >= deadline)):
+                stats['budget_exhausted'] = True
                 break
-            for next_state, next_move in self._get_next_states(current_state):
-                new_g_score = g_score + 1
-                if next_state not in visited or new_g_score < visited[next_state]:
-                    visited[next_state] = new_g_score
-                    h_score = self._heuristic(next_state)
-                    f_score = new_g_score + h_score
-                    heapq.heappush(priority_queue, (f_score, new_g_score, next_state, current_state, next_move))
+            if progress is not None and step and step % interval == 0:
+                stats['expanded'] = expanded_before + step
+                stats['open_peak'] = open_peak
+                progress(self._snapshot(len(visited), len(open_list), start_time))
+            if timed:
+                t0 = time.perf_counter()
+            next_states = get_next_states(current_state)
+            if timed:
+                time_successors += time.perf_counter() - t0
+            for next_state, next_move in next_states:
+                # 宏动作（列表）的代价为其中的步数
+                new_g_score = g_score + (len(next_move) if next_move.__class__ is list else 1)
+                next_key = self._key(next_state)
+                old_g_score = visited.get(next_key)
+                if old_g_score is not None and new_g_score >= old_g_score:
+                    stats['duplicates'] += 1
+                    continue
+                visited[next_key] = new_g_score
+                if timed:
+                    t0 = time.perf_counter()
+                next_info = self._next_heuristic(h_info, current_state[1], next_state[1])
+                if timed:
+                    time_heuristic += time.perf_counter() - t0
+                if next_info is None:
+                    stats['pruned_matching'] += 1
+                    continue
+                if bound is not None and new_g_score + next_info[0] >= bound:
+                    stats['pruned_bound'] += 1
+                    continue
+                f_score = new_g_score + int(next_info[0] * weight)
+                if timed:
+                    t0 = time.perf_counter()
+                open_list.push(f_score, new_g_score, (next_key, next_state, current_key, next_move, next_info))
+                if timed:
+                    time_open_list += time.perf_counter() - t0
+                stats['generated'] += 1
+            if len(open_list) > open_peak:
+                open_peak = len(open_list)
             step += 1
-        if goal_state is None:
-            if self.debug:
-                print("[A*] No solution found.")
+        stats['expanded'] = expanded_before + step
+        stats['open_peak'] = open_peak
+        stats['time_successors'] += time_successors * sample
+        stats['time_heuristic'] += time_heuristic * sample
+        stats['time_open_list'] += time_open_list * sample
+        self._snapshot(len(visited), len(open_list), start_time)
+        if visited.__class__ is DiskClosedSet:
+            stats.update(visited.stats)
+            path = None if goal_key is None else visited.path(goal_key)
+            visited.close()
+            return None if path is None else (path, goal_g)
+        if goal_key is None:
             return None
         # 回溯路径
         path = []
-        state = goal_state
-        while state in parent_map:
-            parent, move = parent_map[state]
+        key = goal_key
+        while key in parent_map:
+            parent, move = parent_map[key]
             path.append(move)
-            state = parent
+            key = parent
         path.reverse()
+        return path, goal_g
+
+    def solve_ida(self, table_size=1 << 20, progress=None, progress_interval=None):
+        """
+        内存受限的 IDA* 求解，输入地图与返回路径格式均与 solve() 相同。
+
+        以 f = g + h 为阈值迭代加深，每轮只保存当前深度优先路径；另用一张
+        table_size 项的定长置换表（按 Zobrist 哈希取模定位）记录本轮到达各状态
+        时的最小 g，用于剪掉重复到达的分支。表满时采用“深度优先”替换策略：
+        空槽、上一轮的旧记录或 g 更小的新记录才会覆盖原有记录，
+        因此内存占用始终不超过 table_size 项。IDA* 始终使用未加权的 h，返回最优解。
+        progress / progress_interval 与 solve() 相同，其中 open_size 为当前搜索深度。
+        """
+        self._reset_stats()
+        stats = self.stats
+        start_time = time.perf_counter()
+        if progress is None and self.debug:
+            progress = self._print_progress
+        interval = progress_interval or self.PROGRESS_INTERVAL
+        start_state, get_next_states = self._search_start()
+        start_info = self.heuristic.initial(start_state[1])
+        if start_info is None:
+            if self.debug:
+                print("[IDA*] Initial state is a deadlock. No solution found.")
+            return None
+        tt_keys = [None] * table_size
+        tt_g = [0] * table_size
+        tt_iteration = [0] * table_size
+        bound = start_info[0]
+        iteration = 0
+        while True:
+            iteration += 1
+            next_bound = None
+            if self.debug:
+                print(f"[IDA*] Iteration {iteration}, bound={bound}")
+            if self._is_goal(start_state):
+                return []
+            # 栈帧：(state, g, h_info, 按 f 排序的后继列表, 下一个后继下标)；moves 与栈帧一一对应
+            stack = [[start_state, 0, start_info, None, 0]]
+            moves = []
+            while stack:
+                frame = stack[-1]
+                state, g_score, h_info, children, index = frame
+                if children is None:
+                    stats['expanded'] += 1
+                    if progress is not None and stats['expanded'] % interval == 0:
+                        progress(self._snapshot(0, len(stack), start_time))
+                    children = []
+                    for next_state, next_move in get_next_states(state):
+                        next_info = self._next_heuristic(h_info, state[1], next_state[1])
+                        if next_info is None:
+                            stats['pruned_matching'] += 1
+                            continue
+                        cost = len(next_move) if next_move.__class__ is list else 1
+                        children.append((g_score + cost + next_info[0], next_state, next_move, next_info))
+                    stats['generated'] += len(children)
+                    children.sort(key=lambda child: child[0])
+                    frame[3] = children
+                if index >= len(children):
+                    stack.pop()
+                    if moves:
+                        moves.pop()
+                    continue
+                frame[4] = index + 1
+                f_score, next_state, next_move, next_info = children[index]
+                if f_score > bound:
+                    if next_bound is None or f_score < next_bound:
+                        next_bound = f_score
+                    continue
+                new_g_score = g_score + (len(next_move) if next_move.__class__ is list else 1)
+                next_key = self._key(next_state)
+                slot = next_state[2] % table_size
+                if tt_keys[slot] == next_key and tt_iteration[slot] == iteration and tt_g[slot] <= new_g_score:
+                    stats['duplicates'] += 1
+                    continue
+                if tt_iteration[slot] != iteration or tt_keys[slot] == next_key or new_g_score <= tt_g[slot]:
+                    tt_keys[slot] = next_key
+                    tt_g[slot] = new_g_score
+                    tt_iteration[slot] = iteration
+                moves.append(next_move)
+                if self._is_goal(next_state):
+                    self._snapshot(0, len(stack), start_time)
+                    path = self._finish_path(moves)
+                    if self.debug:
+                        print(f"[IDA*] Solution found. Steps: {len(path)}. Path: {''.join(path)}")
+                    return path
+                stack.append([next_state, new_g_score, next_info, None, 0])
+            if next_bound is None:
+                self._snapshot(0, 0, start_time)
+                if self.debug:
+                    print("[IDA*] No solution found.")
+                return None
+            bound = next_bound
+
+    def _goal_states(self, box_count):
+        """
+        反向搜索的起点：箱子恰好占据 box_count 个目标点的每种布局，与其中每个
+        与箱子相邻的玩家连通区域（用区域中最小的格子表示）的组合。
+        """
+        floor = [idx for idx in range(self.size) if not self._is_wall(*self._position(idx))]
+        states = []
+        for cells in combinations(sorted(self._index(pos) for pos in self.targets), box_count):
+            boxes = sum(1 << cell for cell in cells)
+            assigned = set(cells)
+            for cell in floor:
+                if cell in assigned:
+                    continue
+                region = self._reachable(cell, boxes)
+                assigned |= region
+                if any(self.step[d][idx] in cells for idx in region for d in range(4)):
+                    canonical = min(region)
+                    states.append((canonical, boxes, self._hash(canonical, boxes)))
+        return states
+
+    def _replay(self, path):
+        """从初始局面逐步执行移动序列，检查每一步都合法、大小写与是否推箱一致，且最终所有箱子都在目标点上。"""
+        player, boxes, _ = self._get_initial_state()
+        for move in path:
+            d = self.move_names.index(move.upper())
+            nxt = self.step[d][player]
+            if nxt < 0:
+                return False
+            pushing = bool(boxes >> nxt & 1)
+            if pushing != move.isupper():
+                return False
+            if pushing:
+                dest = self.step[d][nxt]
+                if dest < 0 or boxes >> dest & 1:
+                    return False
+                boxes ^= (1 << nxt) | (1 << dest)
+            player = nxt
+        return boxes & ~self.target_mask == 0
+
+    def solve_bidirectional(self, progress=None, progress_interval=None, time_limit=None, max_expanded=None,
+                            max_visited=None):
+        """
+        双向推箱级 A* 求解，返回格式与 solve() 相同；无解或预算耗尽时返回 None。
+
+        正向从初始局面做推箱级搜索（启发函数为到目标点的匹配距离），反向从 _goal_states()
+        给出的全部终局做拉箱搜索（启发函数为拉回初始位置的匹配距离）。两侧的 g 表都以
+        _key() 为键，新生成的状态出现在对侧表中即为一次相遇，记录 g 之和最小的相遇点。
+        每次扩展开放列表较小的一侧；当被扩展一侧的最小 f 不小于当前最优相遇代价时，
+        不可能再有更短的解，拼接两段推箱序列、补全行走步骤并用 _replay() 校验后返回。
+        不受 push_level 影响，始终返回推箱数最少的解（macros=True 时除外）。
+
+        预算与进度回调同 solve()，max_visited 按两侧 g 表的总规模计；
+        stats['expanded_backward'] 为其中反向扩展的节点数。
+        """
+        self._reset_stats()
+        stats = self.stats
+        stats['expanded_backward'] = 0
+        start_time = time.perf_counter()
+        deadline = start_time + time_limit if time_limit is not None else None
+        if progress is None and self.debug:
+            progress = self._print_progress
+        interval = progress_interval or self.PROGRESS_INTERVAL
+        start_state = self._normalize(self._get_initial_state())
+        start_key = self._key(start_state)
+        start_info = self.heuristic.initial(start_state[1])
+        if start_info is None:
+            if self.debug:
+                print("[Bidirectional] Initial state is a deadlock. No solution found.")
+            return None
+        if self._is_goal(start_state):
+            return []
+        reverse = ReverseHeuristic(self, start_state[1])
+        # 两侧的 g 表与连接表：正向 key -> (父 key, move)，反向 key -> (更靠近终局的 key, move)，
+        # move 均为正向推箱，拼接时无需翻转方向；开放列表条目为 (key, state, 正向匹配信息)
+        g_tables = ({start_key: 0}, {})
+        links = ({}, {})
+        opens = (BucketOpenList(), BucketOpenList())
+        opens[0].push(start_info[0], 0, (start_key, start_state, start_info))
+        for state in self._goal_states(bin(start_state[1]).count('1')):
+            key = self._key(state)
+            h = reverse.estimate(state[1])
+            if h is None or key in g_tables[1]:
+                continue
+            g_tables[1][key] = 0
+            opens[1].push(h, 0, (key, state, None))
+        best_cost = None
+        meet_key = None
+        step = 0
+        while opens[0] and opens[1]:
+            if ((max_expanded is not None and step >= max_expanded)
+                    or (max_visited is not None and len(g_tables[0]) + len(g_tables[1]) >= max_visited)
+                    or (deadline is not None and step % self.TIMING_SAMPLE == 0 and time.perf_counter() >= deadline)):
+                stats['budget_exhausted'] = True
+                break
+            side = 0 if len(opens[0]) <= len(opens[1]) else 1
+            f_score, g_score, (current_key, current_state, h_info) = opens[side].pop()
+            if best_cost is not None and f_score >= best_cost:
+                break
+            own, other = g_tables[side], g_tables[1 - side]
+            if g_score > own[current_key]:
+                stats['stale'] += 1
+                continue
+            if progress is not None and step and step % interval == 0:
+                stats['expanded'] = step
+                progress(self._snapshot(len(own) + len(other), len(opens[0]) + len(opens[1]), start_time))
+            step += 1
+            if side:
+                stats['expanded_backward'] += 1
+                next_states = self._get_pull_states(current_state)
+            else:
+                next_states = self._get_push_states(current_state)
+            for next_state, next_move in next_states:
+                new_g_score = g_score + (len(next_move) if next_move.__class__ is list else 1)
+                next_key = self._key(next_state)
+                if next_key in own and new_g_score >= own[next_key]:
+                    stats['duplicates'] += 1
+                    continue
+                if side:
+                    next_info = None
+                    h = reverse.estimate(next_state[1])
+                else:
+                    next_info = self._next_heuristic(h_info, current_state[1], next_state[1])
+                    h = None if next_info is None else next_info[0]
+                if h is None:
+                    stats['pruned_matching'] += 1
+                    continue
+                own[next_key] = new_g_score
+                links[side][next_key] = (current_key, next_move)
+                if next_key in other and (best_cost is None or new_g_score + other[next_key] < best_cost):
+                    best_cost = new_g_score + other[next_key]
+                    meet_key = next_key
+                opens[side].push(new_g_score + h, new_g_score, (next_key, next_state, next_info))
+                stats['generated'] += 1
+            open_size = len(opens[0]) + len(opens[1])
+            if open_size > stats['open_peak']:
+                stats['open_peak'] = open_size
+        stats['expanded'] = step
+        self._snapshot(len(g_tables[0]) + len(g_tables[1]), len(opens[0]) + len(opens[1]), start_time)
         if self.debug:
-            print(f"[A*] Solution found. Steps: {len(path)}. Path: {''.join(path)}")
+            self._print_progress(stats)
+        if meet_key is None or stats['budget_exhausted']:
+            if self.debug:
+                print("[Bidirectional] Search budget exhausted." if stats['budget_exhausted'] else "[Bidirectional] No solution found.")
+            return None
+        # 正向段从相遇点回溯到起点后翻转，反向段从相遇点顺着连接表走到终局
+        pushes = []
+        key = meet_key
+        while key in links[0]:
+            key, move = links[0][key]
+            pushes.append(move)
+        pushes.reverse()
+        key = meet_key
+        while key in links[1]:
+            key, move = links[1][key]
+            pushes.append(move)
+        flat = []
+        for move in pushes:
+            if move.__class__ is list:
+                flat.extend(move)
+            else:
+                flat.append(move)
+        path = self._expand_pushes(flat)
+        if not self._replay(path):
+            raise RuntimeError("双向搜索拼接出的路径未通过校验")
+        if self.debug:
+            print(f"[Bidirectional] Solution found. Pushes: {best_cost}. Steps: {len(path)}. Path: {''.join(path)}")
         return path
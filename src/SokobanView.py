@@ -1,29 +1,68 @@
 import tkinter as tk
-from typing import List, Any
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 
 
-def draw_tile(canvas: tk.Canvas, solver: Any, tile_size: int, r: int, c: int, tile_type: str) -> None:
+def draw_tile(canvas: tk.Canvas, solver: Any, tile_size: int, r: int, c: int, tile_type: str) -> List[int]:
+    # 返回为该格创建的画布图元编号，供增量重绘时删除
+    items = []
     x1, y1 = c * tile_size, r * tile_size
     x2, y2 = x1 + tile_size, y1 + tile_size
     fill_color = 'white'
     outline_color = 'gray'
     if tile_type == solver.TARGET or tile_type == solver.PLAYER_ON_TARGET or tile_type == solver.BOX_ON_TARGET:
-        canvas.create_rectangle(x1, y1, x2, y2, fill='lightyellow', outline=outline_color)
-        canvas.create_oval(x1 + 5, y1 + 5, x2 - 5, y2 - 5, fill='gold', outline='orange')
+        items.append(canvas.create_rectangle(x1, y1, x2, y2, fill='lightyellow', outline=outline_color))
+        items.append(canvas.create_oval(x1 + 5, y1 + 5, x2 - 5, y2 - 5, fill='gold', outline='orange'))
     else:
-        canvas.create_rectangle(x1, y1, x2, y2, fill=fill_color, outline=outline_color)
+        items.append(canvas.create_rectangle(x1, y1, x2, y2, fill=fill_color, outline=outline_color))
     if tile_type == solver.WALL:
-        canvas.create_rectangle(x1, y1, x2, y2, fill='brown', outline='black')
+        items.append(canvas.create_rectangle(x1, y1, x2, y2, fill='brown', outline='black'))
     if tile_type == solver.PLAYER or tile_type == solver.PLAYER_ON_TARGET:
-        canvas.create_oval(x1 + 8, y1 + 8, x2 - 8, y2 - 8, fill='blue', tags='player')
+        items.append(canvas.create_oval(x1 + 8, y1 + 8, x2 - 8, y2 - 8, fill='blue', tags='player'))
     if tile_type == solver.BOX or tile_type == solver.BOX_ON_TARGET:
         color = 'saddlebrown' if tile_type == solver.BOX else 'limegreen'
-        canvas.create_rectangle(x1 + 5, y1 + 5, x2 - 5, y2 - 5, fill=color, tags='box')
+        items.append(canvas.create_rectangle(x1 + 5, y1 + 5, x2 - 5, y2 - 5, fill=color, tags='box'))
+    return items
 
 
+class BoardView:
+    """
+    增量绘制棋盘：每个格子的图元只在该格内容变化时重建。
 
-def draw_board(canvas: tk.Canvas, rows: int, cols: int, current_map: List[List[str]], solver: Any, tile_size: int) -> None:
-    canvas.delete("all")
-    for r in range(rows):
-        for c in range(cols):
-            draw_tile(canvas, solver, tile_size, r, c, current_map[r][c])
+    tiles 记录每格当前显示的字符，items 为格子 -> 图元编号的索引。
+    render() 逐格比较后只重绘有变化的格子（尺寸改变时才整体重建）；
+    update_cells() 只处理调用方给出的格子，回放一步的代价与棋盘大小无关。
+    """
+
+    def __init__(self, canvas: tk.Canvas, tile_size: int) -> None:
+        self.canvas = canvas
+        self.tile_size = tile_size
+        self.rows = 0
+        self.cols = 0
+        self.tiles: List[List[Optional[str]]] = []
+        self.items: Dict[Tuple[int, int], List[int]] = {}
+
+    def _redraw_cell(self, solver: Any, r: int, c: int, tile_type: str) -> None:
+        old = self.items.pop((r, c), None)
+        if old:
+            self.canvas.delete(*old)
+        self.items[(r, c)] = draw_tile(self.canvas, solver, self.tile_size, r, c, tile_type)
+        self.tiles[r][c] = tile_type
+
+    def render(self, current_map: List[List[str]], solver: Any) -> None:
+        rows, cols = len(current_map), len(current_map[0]) if current_map else 0
+        if rows != self.rows or cols != self.cols:
+            self.canvas.delete("all")
+            self.rows, self.cols = rows, cols
+            self.tiles = [[None] * cols for _ in range(rows)]
+            self.items = {}
+        for r in range(rows):
+            shown = self.tiles[r]
+            row = current_map[r]
+            for c in range(cols):
+                if shown[c] != row[c]:
+                    self._redraw_cell(solver, r, c, row[c])
+
+    def update_cells(self, current_map: List[List[str]], solver: Any, cells: Iterable[Tuple[int, int]]) -> None:
+        for r, c in cells:
+            if self.tiles[r][c] != current_map[r][c]:
+                self._redraw_cell(solver, r, c, current_map[r][c])
@@ -0,0 +1,81 @@
+import multiprocessing
+import queue
+from typing import List, Optional, Tuple
+
+from SokobanSolver import SokobanSolver
+from SokobanGenerator import generate_level
+
+
+def _solve_worker(board_map: List[str], debug: bool, progress_interval: int, messages) -> None:
+    # 在子进程中运行：进度与结果都通过队列发回主进程
+    try:
+        solver = SokobanSolver(board_map, debug=debug)
+        path = solver.solve(progress=lambda stats: messages.put(('progress', stats)),
+                            progress_interval=progress_interval)
+        messages.put(('done', path, solver.stats))
+    except Exception as e:
+        messages.put(('error', str(e)))
+
+
+def _generate_worker(rows: int, cols: int, boxes: int, options: dict, messages) -> None:
+    # 在子进程中运行：生成（含推箱级验证求解）完成后把关卡记录发回主进程
+    try:
+        messages.put(('done', generate_level(rows, cols, boxes, **options)))
+    except Exception as e:
+        messages.put(('error', str(e)))
+
+
+class SolveJob:
+    """
+    在后台进程中运行 SokobanSolver.solve()，避免阻塞 Tk 主线程。
+
+    搜索在独立进程中进行，不与界面争抢 GIL；主线程定期调用 poll() 取回消息，
+    cancel() 直接终止子进程。
+    """
+
+    # poll() 报告子进程异常退出时使用的名称
+    PROCESS_NAME = "求解进程"
+
+    def __init__(self, board_map: List[str], debug: bool = False, progress_interval: int = 2000) -> None:
+        self.messages = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=_solve_worker, args=(board_map, debug, progress_interval, self.messages), daemon=True)
+        self.process.start()
+
+    def poll(self) -> List[Tuple]:
+        """取回目前已到达的全部消息：('progress', stats) / ('done', path, stats) / ('error', message)。"""
+        received = []
+        while True:
+            try:
+                received.append(self.messages.get_nowait())
+            except queue.Empty:
+                break
+        if not received and not self.process.is_alive() and self.process.exitcode not in (0, None):
+            received.append(('error', f"{self.PROCESS_NAME}异常退出 (exit code {self.process.exitcode})"))
+        return received
+
+    def cancel(self) -> None:
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout=1)
+        self.messages.close()
+
+    def finish(self) -> None:
+        # 收到结果后回收子进程
+        self.process.join(timeout=1)
+        self.messages.close()
+
+
+class GenerateJob(SolveJob):
+    """
+    在后台进程中运行 generate_level()：每次尝试都要做一次推箱级验证求解，大地图上耗时可达数秒，
+    同样交给子进程以免阻塞 Tk 主线程。poll() 返回 ('done', record) / ('error', message)。
+    """
+
+    PROCESS_NAME = "生成进程"
+
+    def __init__(self, rows: int, cols: int, boxes: int, **options) -> None:
+        self.messages = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=_generate_worker, args=(rows, cols, boxes, options, self.messages), daemon=True)
+        self.process.start()
@@ -1,6 +1,7 @@
 
 import sys
 import argparse
+import multiprocessing
 import tkinter as tk
 from SokobanSolver import SokobanSolver
 from SokobanGUI import SokobanGUI
@@ -8,6 +9,8 @@ from SokobanGUI import SokobanGUI
 
 
 if __name__ == "__main__":
+    # 打包为可执行文件后，后台求解子进程需要此调用才能正确启动
+    multiprocessing.freeze_support()
     parser = argparse.ArgumentParser(description="Sokoban Solver GUI")
     parser.add_argument('--debug', action='store_true', help='启用A*调试输出')
     args = parser.parse_args()